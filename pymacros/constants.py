@@ -23,6 +23,7 @@ GENERIC_LAYOUT_FILE_FILTER = ';;'.join([
     'OASIS Files (*.oas)'
 ])
 
+# NOTE: lowercase, so path_str.lower().endswith(HIERARCHICAL_LAYOUT_FILE_SUFFIXES) can be used
 HIERARCHICAL_LAYOUT_FILE_SUFFIXES = ('.klay.gds', '.klay.gds.gz', '.klay.txt', '.klay.oas')
 HIERARCHICAL_LAYOUT_FILE_FILTER = ';;'.join([
     'Hierarchical GDS2 Files (*.klay.gds *.klay.gds.gz)',
@@ -16,8 +16,10 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 #--------------------------------------------------------------------------------
 
+from concurrent.futures import Future, ThreadPoolExecutor
 import os
 from pathlib import Path
+import stat
 from typing import *
 import traceback
 
@@ -56,6 +58,141 @@ path_containing_this_script = os.path.realpath(os.path.dirname(__file__))
 
 #--------------------------------------------------------------------------------
 
+_ui_data: Optional[bytes] = None
+
+
+def library_manager_dialog_ui_data() -> bytes:
+    # NOTE: pya has no uic, the .ui file is still loaded via QUiLoader,
+    #       but read from disk only once per session
+    global _ui_data
+    if _ui_data is None:
+        ui_path = os.path.join(path_containing_this_script, "LibraryManagerDialog.ui")
+        with open(ui_path, 'rb') as f:
+            _ui_data = f.read()
+    return _ui_data
+
+#--------------------------------------------------------------------------------
+
+VALID_CELL_BACKGROUND = pya.QColor(255, 255, 255)
+INVALID_CELL_BACKGROUND = pya.QColor(255, 0, 0, 50)  # light red
+
+#--------------------------------------------------------------------------------
+
+_resource_icons: Dict[str, pya.QIcon] = {}
+
+
+def resource_icon(resource_path: str) -> pya.QIcon:
+    # NOTE: created lazily, QIcon requires the application to exist
+    icon = _resource_icons.get(resource_path, None)
+    if icon is None:
+        icon = pya.QIcon(resource_path)
+        _resource_icons[resource_path] = icon
+    return icon
+
+#--------------------------------------------------------------------------------
+
+_include_check_executor: Optional[ThreadPoolExecutor] = None
+
+
+def include_check_executor() -> ThreadPoolExecutor:
+    global _include_check_executor
+    if _include_check_executor is None:
+        _include_check_executor = ThreadPoolExecutor(max_workers=2, 
+                                                     thread_name_prefix='LibraryMapIncludeCheck')
+    return _include_check_executor
+
+
+_stat_prefetch_executor: Optional[ThreadPoolExecutor] = None
+
+
+def stat_prefetch_executor() -> ThreadPoolExecutor:
+    global _stat_prefetch_executor
+    if _stat_prefetch_executor is None:
+        _stat_prefetch_executor = ThreadPoolExecutor(max_workers=8, 
+                                                     thread_name_prefix='LibraryMapStatPrefetch')
+    return _stat_prefetch_executor
+
+
+def stat_or_none(path: Path) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def check_library_map_include(path: Path, 
+                              st: os.stat_result,
+                              config_cache: Dict[Tuple[Path, int], LibraryMapConfig]) -> Tuple[bool, str, str]:
+    """
+    Read and resolve an included library map, returns (valid, status, tool tip)
+    
+    NOTE: runs on a worker thread, therefore must not touch any pya objects
+    """
+    try:
+        key = (path, st.st_mtime_ns)
+        cfg = config_cache.get(key, None)
+        if cfg is None:
+            cfg = LibraryMapConfig.read_json(path)
+            config_cache[key] = cfg
+        issues = LibraryMapIssues()
+        cfg.effective_library_definitions(base_folder=path.parent, issues=issues)
+    except Exception as ex:
+        return (False, f"Unreadable: {ex}", '')
+    if issues.failed_libraries or issues.failed_includes:
+        return (False, "Missing files!", issues.rich_text())
+    return (True, 'OK', '')
+
+#--------------------------------------------------------------------------------
+
+class FileSelectorDelegate(pya.QStyledItemDelegate):
+    """
+    Item delegate for path columns, the FileSelectorWidget editor is only created while editing
+    """
+    
+    def __init__(self, 
+                 parent: pya.QObject,
+                 file_dialog_title: str,
+                 file_types: List[str],
+                 path_transformer: Callable[[Path], Path],
+                 on_path_changed: Callable[[pya.QModelIndex], None]):
+        super().__init__(parent)
+        self.file_dialog_title = file_dialog_title
+        self.file_types = file_types
+        self.path_transformer = path_transformer
+        self.on_path_changed = on_path_changed
+        
+    def createEditor(self, 
+                     parent: pya.QWidget, 
+                     option: pya.QStyleOptionViewItem, 
+                     index: pya.QModelIndex) -> pya.QWidget:
+        editor = FileSelectorWidget(
+            parent,
+            editable=True,
+            file_dialog_title=self.file_dialog_title,
+            file_types=self.file_types,
+            path_transformer=self.path_transformer
+        )
+        
+        def commit(file_selector_widget):
+            self.emit_commitData(file_selector_widget)
+            
+        editor.on_path_changed += [commit]
+        return editor
+    
+    def setEditorData(self, editor: pya.QWidget, index: pya.QModelIndex):
+        path = index.data(pya.Qt.EditRole) or ''
+        if editor.path != path:
+            editor.path = path
+    
+    def setModelData(self, editor: pya.QWidget, model: pya.QAbstractItemModel, index: pya.QModelIndex):
+        path = editor.path
+        if path == (index.data(pya.Qt.EditRole) or ''):
+            return
+        model.setData(index, path, pya.Qt.EditRole)
+        self.on_path_changed(index)
+
+#--------------------------------------------------------------------------------
+
 class LibraryManagerDialog(pya.QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -63,20 +200,50 @@ class LibraryManagerDialog(pya.QDialog):
         self.layout_path: Optional[Path] = None
         self.lib_path: Optional[Path] = None
         self.config: Optional[LibraryMapConfig] = None
+        self.written_config: Optional[LibraryMapConfig] = None  # NOTE: last config written by OK/Apply
+        # NOTE: what the file on disk corresponds to as far as the UI is concerned,
+        #       OK/Apply only write if the UI differs from it
+        self._unmodified_config: Optional[LibraryMapConfig] = None
+        
+        # NOTE: validation runs on every path change, 
+        #       avoid hitting the file system again for paths we already know
+        self._resolved_path_cache: Dict[str, Path] = {}
+        self._stat_cache: Dict[Path, Optional[os.stat_result]] = {}
+        self._include_config_cache: Dict[Tuple[Path, int], LibraryMapConfig] = {}
+        self._include_check_results: Dict[Tuple[Path, int], Tuple[bool, str, str]] = {}
+        
+        # NOTE: includes are read and resolved on a worker thread,
+        #       results are polled and applied on the UI thread
+        self._pending_include_checks: List[Tuple[pya.QTreeWidgetItem, int, int, Tuple[Path, int], Future]] = []
+        
+        # NOTE: rows are only re-validated after they were added, removed or edited
+        self._validation_dirty = True
+        self._last_validation_result: Optional[bool] = None
 
-        self.init_ui()
+        # NOTE: the .ui file is loaded on first use (population or show),
+        #       so a dialog that is constructed but never shown stays cheap
+        self._ui_initialized = False
+        
+    def ensure_ui(self):
+        if not self._ui_initialized:
+            self._ui_initialized = True
+            self.init_ui()
+    
+    def showEvent(self, event: pya.QShowEvent):
+        self.ensure_ui()
+        super().showEvent(event)
         
     def init_ui(self):        
         self.setWindowTitle('Cell Library Manager')
 
         loader = pya.QUiLoader()
-        ui_path = os.path.join(path_containing_this_script, "LibraryManagerDialog.ui")
-        ui_file = pya.QFile(ui_path)
+        ui_buffer = pya.QBuffer()
+        ui_buffer.setData(library_manager_dialog_ui_data())
         try:
-            ui_file.open(pya.QFile.ReadOnly)
-            self.page = loader.load(ui_file, self)
+            ui_buffer.open(pya.QIODevice.ReadOnly)
+            self.page = loader.load(ui_buffer, self)
         finally:
-            ui_file.close()
+            ui_buffer.close()
 
         self.bottom = pya.QHBoxLayout()
         self.resetButton = pya.QPushButton('Reset')
@@ -111,10 +278,10 @@ class LibraryManagerDialog(pya.QDialog):
         self.cancelButton.setAutoDefault(False)
         
         for pb in (self.page.library_add_pb, self.page.include_add_pb):
-            pb.icon = pya.QIcon(':add_16px')
+            pb.icon = resource_icon(':add_16px')
             
         for pb in (self.page.library_remove_pb, self.page.include_remove_pb):
-            pb.icon = pya.QIcon(':del_16px')
+            pb.icon = resource_icon(':del_16px')
 
         for pb in (self.page.library_add_pb, self.page.include_add_pb,
                    self.page.library_remove_pb, self.page.include_remove_pb):
@@ -126,18 +293,65 @@ class LibraryManagerDialog(pya.QDialog):
         self.page.include_add_pb.clicked.connect(self.on_add_include)
         self.page.include_remove_pb.clicked.connect(self.on_remove_include)
         
-        self.page.library_mappings_tw.header.setSectionResizeMode(0, pya.QHeaderView.ResizeToContents)
-        self.page.library_mappings_tw.header.setSectionResizeMode(1, pya.QHeaderView.Stretch)
-        self.page.library_mappings_tw.header.setSectionResizeMode(2, pya.QHeaderView.Fixed)
+        # NOTE: stretchLastSection is configured in the .ui file,
+        #       per-section resize modes can't be expressed there
+        library_header = self.page.library_mappings_tw.header
+        library_header.setSectionResizeMode(0, pya.QHeaderView.ResizeToContents)
+        library_header.setSectionResizeMode(1, pya.QHeaderView.Stretch)
+        library_header.setSectionResizeMode(2, pya.QHeaderView.Fixed)
         self.page.library_mappings_tw.setColumnWidth(2, 80)
-        self.page.library_mappings_tw.header.setStretchLastSection(False)      
           
         self.page.includes_tw.header.setSectionResizeMode(0, pya.QHeaderView.Stretch)
         self.page.includes_tw.setColumnWidth(1, 80)
-        self.page.includes_tw.header.setStretchLastSection(False)        
+        
+        # NOTE: all rows are single-line, so Qt does not have to query each row's size hint
+        self.page.library_mappings_tw.setUniformRowHeights(True)
+        self.page.includes_tw.setUniformRowHeights(True)
+        
+        # NOTE: instead of a persistent FileSelectorWidget per row,
+        #       the path cells get their editor only while being edited
+        self.library_path_delegate = FileSelectorDelegate(
+            self.page.library_mappings_tw,
+            file_dialog_title='Select Cell Library File',
+            file_types=[
+               'GDS II Binary file (*.gds *.gds.gz)',
+               'GDS II Text file (*.txt)',
+               'OASIS file (*.oas)',
+               'All Files (*)',
+            ],
+            path_transformer=self.transform_path,
+            on_path_changed=self.on_library_path_changed
+        )
+        self.page.library_mappings_tw.setItemDelegateForColumn(1, self.library_path_delegate)
+        
+        self.include_path_delegate = FileSelectorDelegate(
+            self.page.includes_tw,
+            file_dialog_title='Select Library Map File',
+            file_types=[
+                LIBRARY_MAP_FILE_FILTER
+            ],
+            path_transformer=self.transform_path,
+            on_path_changed=self.on_include_path_changed
+        )
+        self.page.includes_tw.setItemDelegateForColumn(0, self.include_path_delegate)
+        
+        # NOTE: paths are painted as plain text, keep the file name visible when space is tight
+        self.page.library_mappings_tw.setTextElideMode(pya.Qt.ElideMiddle)
+        self.page.includes_tw.setTextElideMode(pya.Qt.ElideMiddle)
+        
+        # NOTE: coalesce bursts of path changes into a single validation pass
+        self._validation_timer = pya.QTimer(self)
+        self._validation_timer.setSingleShot(True)
+        self._validation_timer.setInterval(150)
+        self._validation_timer.timeout.connect(self.validate_ui_inputs)
+        
+        self._include_check_timer = pya.QTimer(self)
+        self._include_check_timer.setInterval(50)
+        self._include_check_timer.timeout.connect(self.on_include_check_timeout)
         
         self.page.library_mappings_tw.itemSelectionChanged.connect(self.on_library_selection_changed)
         self.page.includes_tw.itemSelectionChanged.connect(self.on_include_selection_changed)
+        self.page.library_mappings_tw.itemChanged.connect(self.on_library_item_changed)
 
         # NOTE: qt5 vs qt6 has different QShortCut ctor arguments,
         #       thus use our safety wrapper        
@@ -152,203 +366,370 @@ class LibraryManagerDialog(pya.QDialog):
         ap = LibraryMapConfig.abbreviate_path(path, self.lib_path.parent)
         return ap
     
-    def add_includes_tree_row(self, include_path: str):
+    def add_includes_tree_row(self, include_path: str, set_current: bool = True) -> pya.QTreeWidgetItem:
         tree: pya.QTreeWidget = self.page.includes_tw
         
         status = ''
         item = pya.QTreeWidgetItem()
         item.setFlags(item.flags | pya.Qt.ItemIsEditable)
         tree.addTopLevelItem(item)
-                
-        file_widget = FileSelectorWidget(
-            tree,
-            editable=True,
-            file_dialog_title='Select Library Map File',
-            file_types=[
-                LIBRARY_MAP_FILE_FILTER
-            ],
-            path_transformer=self.transform_path
-        )
-        if include_path:
-            file_widget.path = include_path
         
         path_idx = 0
         status_idx = 1
         
-        tree.setItemWidget(item, path_idx, file_widget)
+        # NOTE: the FileSelectorWidget editor is created on demand by the FileSelectorDelegate
+        item.setText(path_idx, include_path)
         item.setText(status_idx, status)
-        tree.setCurrentItem(item)
-        
-        def on_path_changed(file_selector_widget):
-            self.set_cell_valid(item, path_idx, True)
-            item.setText(status_idx, '')
-            if file_selector_widget.path != '':
-                self.validate_ui_inputs()
+        if set_current:
+            tree.setCurrentItem(item)
+        self._validation_dirty = True
+        return item
         
-        file_widget.on_path_changed += [on_path_changed]
-
-    def add_library_tree_row(self, lib_name: str, lib_path: str):
+    def add_library_tree_row(self, lib_name: str, lib_path: str, set_current: bool = True) -> pya.QTreeWidgetItem:
         tree: pya.QTreeWidget = self.page.library_mappings_tw
         
         status = ''
         item = pya.QTreeWidgetItem()
         item.setFlags(item.flags | pya.Qt.ItemIsEditable)
         tree.addTopLevelItem(item)
-        file_widget = FileSelectorWidget(
-            tree,
-            editable=True,
-            file_dialog_title='Select Cell Library File',
-            file_types=[
-               'GDS II Binary file (*.gds *.gds.gz)',
-               'GDS II Text file (*.txt)',
-               'OASIS file (*.oas)',
-               'All Files (*)',
-            ],
-            path_transformer=self.transform_path
-        )
-        if lib_path:
-            file_widget.path = lib_path
             
         path_idx = 1
         status_idx = 2
         
+        # NOTE: the FileSelectorWidget editor is created on demand by the FileSelectorDelegate
         item.setText(0, lib_name)
-        tree.setItemWidget(item, path_idx, file_widget)
+        item.setText(path_idx, lib_path)
         item.setText(status_idx, status)
-        tree.setCurrentItem(item)
+        if set_current:
+            tree.setCurrentItem(item)
+        self._validation_dirty = True
+        return item
+        
+    def resolve_row_path(self, path_str: str) -> Path:
+        path = self._resolved_path_cache.get(path_str, None)
+        if path is not None:
+            return path
+        path = expand_path(path_str)
+        if not path.is_absolute():
+            path = self.lib_path.parent / path
+        self._resolved_path_cache[path_str] = path
+        return path
+    
+    def cached_stat(self, path: Path) -> Optional[os.stat_result]:
+        if path in self._stat_cache:
+            return self._stat_cache[path]
+        st = stat_or_none(path)
+        self._stat_cache[path] = st
+        return st
+    
+    def prefetch_stats(self, paths: List[Path]):
+        """
+        Fills the stat cache for all uncached paths at once
+        
+        NOTE: os.stat releases the GIL, so on slow (e.g. network) file systems
+              the calls overlap on worker threads instead of adding up
+        """
+        uncached = list(dict.fromkeys(p for p in paths if p not in self._stat_cache))
+        if len(uncached) < 4:
+            return  # NOTE: not worth the hand-off to the workers, cached_stat handles them
+        for path, st in zip(uncached, stat_prefetch_executor().map(stat_or_none, uncached)):
+            self._stat_cache[path] = st
+    
+    def start_include_check(self, item: pya.QTreeWidgetItem, path_idx: int, status_idx: int, path: Path) -> bool:
+        """
+        Starts checking the include on a worker thread, unless the result is already known
+        
+        Returns False if the include is already known to be invalid
+        """
+        st = self.cached_stat(path)
+        key = (path, st.st_mtime_ns)
+        result = self._include_check_results.get(key, None)
+        if result is not None:
+            return self.apply_include_check_result(item, path_idx, status_idx, result)
+        
+        item.setText(status_idx, 'Checking…')
+        future = include_check_executor().submit(check_library_map_include, 
+                                                 path, st, self._include_config_cache)
+        self._pending_include_checks.append((item, path_idx, status_idx, key, future))
+        self._include_check_timer.start()
+        return True
+    
+    def apply_include_check_result(self, 
+                                   item: pya.QTreeWidgetItem, 
+                                   path_idx: int, 
+                                   status_idx: int, 
+                                   result: Tuple[bool, str, str]) -> bool:
+        valid, status, tool_tip = result
+        item.setText(status_idx, status)
+        item.setToolTip(status_idx, tool_tip)
+        self.set_cell_valid(item, path_idx, valid)
+        return valid
+    
+    def on_include_check_timeout(self):
+        still_pending = []
+        any_invalid = False
+        for item, path_idx, status_idx, key, future in self._pending_include_checks:
+            if not future.done():
+                still_pending.append((item, path_idx, status_idx, key, future))
+                continue
+            result = future.result()
+            self._include_check_results[key] = result
+            if not self.apply_include_check_result(item, path_idx, status_idx, result):
+                any_invalid = True
+        self._pending_include_checks = still_pending
+        if not still_pending:
+            self._include_check_timer.stop()
+        if any_invalid:
+            # clear selection, otherwise the red indication could be hidden
+            # NOTE: once per tick, not per result
+            self.page.includes_tw.clearSelection()
+    
+    def drop_pending_include_checks(self, items: List[pya.QTreeWidgetItem]):
+        """
+        Forget pending checks of edited or removed rows, so their outdated results are never applied
+        """
+        self._pending_include_checks = [
+            pending for pending in self._pending_include_checks
+            if not any(pending[0] is item for item in items)
+        ]
+    
+    def invalidate_cached_stat(self, path_str: str):
+        path = self.resolve_row_path(path_str)
+        self._stat_cache.pop(path, None)
         
-        def on_path_changed(file_selector_widget):
-            if item.text(0) == '':
-                path = Path(file_selector_widget.path)
-                stem = stem_without_suffixes(path, HIERARCHICAL_LAYOUT_FILE_SUFFIXES)
-                if stem == path:
-                    stem = stem_without_suffixes(path, GENERIC_LAYOUT_FILE_SUFFIXES)
-                item.setText(0, stem)
-            self.set_cell_valid(item, path_idx, True)
-            item.setText(status_idx, '')
-            self.validate_ui_inputs()
+        # NOTE: the nested libraries of an include may have changed without touching its mtime
+        for key in [k for k in self._include_check_results if k[0] == path]:
+            del self._include_check_results[key]
         
-        file_widget.on_path_changed += [on_path_changed]
+    def on_include_path_changed(self, index: pya.QModelIndex):
+        path_idx = 0
+        status_idx = 1
+        
+        item = self.page.includes_tw.topLevelItem(index.row())
+        self.drop_pending_include_checks([item])
+        self.invalidate_cached_stat(item.text(path_idx))
+        self._validation_dirty = True
+        self.set_cell_valid(item, path_idx, True)
+        item.setText(status_idx, '')
+        if item.text(path_idx) != '':
+            self._validation_timer.start()
+        
+    def on_library_path_changed(self, index: pya.QModelIndex):
+        path_idx = 1
+        status_idx = 2
+        
+        item = self.page.library_mappings_tw.topLevelItem(index.row())
+        self.invalidate_cached_stat(item.text(path_idx))
+        self._validation_dirty = True
+        if item.text(0) == '':
+            path = Path(item.text(path_idx))
+            stem = stem_without_suffixes(path, HIERARCHICAL_LAYOUT_FILE_SUFFIXES)
+            if stem == path:
+                stem = stem_without_suffixes(path, GENERIC_LAYOUT_FILE_SUFFIXES)
+            item.setText(0, stem)
+        self.set_cell_valid(item, path_idx, True)
+        item.setText(status_idx, '')
+        self._validation_timer.start()
+    
+    def on_library_item_changed(self, item: pya.QTreeWidgetItem, column: int):
+        if column == 0:  # library name edited
+            self._validation_dirty = True
 
     def update_ui_from_config(self, layout_path: Path, lib_path: Path, config: LibraryMapConfig):
+        self.ensure_ui()
+        
         self.layout_path = layout_path
         self.lib_path = lib_path
         self.config = config
+        self.written_config = None
+        
+        self._resolved_path_cache.clear()
+        self._stat_cache.clear()
+        self._include_config_cache.clear()
+        self._include_check_results.clear()
+        self._validation_dirty = True
     
         self.page.layout_path_le.text = str(layout_path)
         self.page.lib_path_le.text = str(lib_path)
         
-        self.page.library_mappings_tw.clear()
-        self.page.includes_tw.clear()
-
-        for ld in config.library_definitions:
-            self.add_library_tree_row(lib_name=ld.lib_name, lib_path=str(ld.lib_path))
+        library_rows = [(ld.lib_name, str(ld.lib_path)) for ld in config.library_definitions]
+        include_rows = [str(inc.include_path) for inc in config.library_map_includes]
         
-        for inc in config.library_map_includes:
-            self.add_includes_tree_row(include_path=str(inc.include_path))
+        # NOTE: e.g. on reset without any edits, the rows are already there,
+        #       only their status has to be validated again
+        rows_unchanged = [(n, p) for _item, n, p in self.library_rows()] == library_rows and \
+                         [p for _item, p in self.include_rows()] == include_rows
+        if not rows_unchanged:
+            self.populate_trees(library_rows, include_rows)
 
-        selected = self.page.library_mappings_tw.selectedItems()
-        self.page.library_remove_pb.setEnabled(bool(selected))
-        selected = self.page.includes_tw.selectedItems()
-        self.page.include_remove_pb.setEnabled(bool(selected))
+        self.on_library_selection_changed()
+        self.on_include_selection_changed()
+        
+        # NOTE: compared to config_from_ui(), not to config itself,
+        #       as the UI does not represent comments and the technology
+        self._unmodified_config = self.config_from_ui()
         
         self.validate_ui_inputs()
         
+    def populate_trees(self, library_rows: List[Tuple[str, str]], include_rows: List[str]):
+        trees = (self.page.library_mappings_tw, self.page.includes_tw)
+
+        # NOTE: populate both trees in one batch,
+        #       otherwise each added row triggers a repaint and a selection signal
+        for tree in trees:
+            tree.setUpdatesEnabled(False)
+            tree.blockSignals(True)
+        
+        # NOTE: ResizeToContents would measure all rows again for each added row
+        library_header = self.page.library_mappings_tw.header
+        library_header.setSectionResizeMode(0, pya.QHeaderView.Interactive)
+        try:
+            for tree in trees:
+                tree.clear()
+
+            for lib_name, lib_path in library_rows:
+                self.add_library_tree_row(lib_name=lib_name, lib_path=lib_path, set_current=False)
+
+            for include_path in include_rows:
+                self.add_includes_tree_row(include_path=include_path, set_current=False)
+        finally:
+            library_header.setSectionResizeMode(0, pya.QHeaderView.ResizeToContents)
+            for tree in trees:
+                tree.blockSignals(False)
+                tree.setUpdatesEnabled(True)  # NOTE: implies a repaint
+
     def set_cell_valid(self, item: pya.QTreeWidgetItem, column: int, valid: bool):
-        color = pya.QColor(255, 255, 255) if valid \
-                else pya.QColor(255, 0, 0, 50)     # light red
+        color = VALID_CELL_BACKGROUND if valid else INVALID_CELL_BACKGROUND
         compat_QTreeWidgetItem_setBackground(item, column, color)
-        item_widget = item.treeWidget().itemWidget(item, column)
-        if item_widget is not None:  # only for the FileSelectorWidget
-            item_widget.set_valid(valid)
     
-    def validate_ui_inputs(self) -> bool:
+    def library_rows(self) -> List[Tuple[pya.QTreeWidgetItem, str, str]]:
+        """
+        Rows of the library tree as (item, lib_name, lib_path) tuples
+        """
+        tree = self.page.library_mappings_tw
+        rows = []
+        for i in range(0, tree.topLevelItemCount):
+            item = tree.topLevelItem(i)
+            rows.append((item, item.text(0), item.text(1)))
+        return rows
+
+    def include_rows(self) -> List[Tuple[pya.QTreeWidgetItem, str]]:
+        """
+        Rows of the includes tree as (item, include_path) tuples
+        """
+        tree = self.page.includes_tw
+        rows = []
+        for i in range(0, tree.topLevelItemCount):
+            item = tree.topLevelItem(i)
+            rows.append((item, item.text(0)))
+        return rows
+
+    def validate_ui_inputs(self, force: bool = False) -> bool:
+        """
+        Validates all rows, returns False if any row is invalid
+        
+        NOTE: without force, the last result is reused if no row changed since;
+              explicit OK/Apply use force, as files may have changed on disk
+        """
         if Debugging.DEBUG:
             debug("LibraryManagerDialog.validate_ui_inputs")
 
+        # NOTE: direct validation (e.g. OK/Apply) supersedes a pending debounced one
+        self._validation_timer.stop()
+        
+        if not force and not self._validation_dirty and self._last_validation_result is not None:
+            return self._last_validation_result
+        
+        # NOTE: results of include checks from a previous pass are outdated
+        self._pending_include_checks.clear()
+        
         valid = True
         
-        already_seen_paths: Set[Path] = set()
+        # NOTE: keyed by path strings, which hash cheaper than Path objects
+        already_seen_paths: Set[str] = set()
         
         def update_path_status(item: pya.QTreeWidgetItem, path_idx: int, status_idx: int, path: Path) -> bool:
-            path = expand_path(path)
+            # NOTE: path is already expanded by resolve_row_path
+            path_str = os.fspath(path)
             item_is_valid = False
-            if not path.exists():
+            st = self.cached_stat(path)
+            if st is None:
                 item_is_valid = False
                 item.setText(status_idx, 'Not found!')  # update status
-            elif not path.is_file():
+            elif not stat.S_ISREG(st.st_mode):
                 item_is_valid = False
                 item.setText(status_idx, 'Not a file!')  # update status
             elif self.layout_path == path:
                 item_is_valid = False
                 item.setText(status_idx, 'Recursion!')  # update status
-            elif path in already_seen_paths:
+            elif path_str in already_seen_paths:
                 item_is_valid = False
                 item.setText(status_idx, 'Duplicate!')  # update status
             else:
                 item_is_valid = True
                 item.setText(status_idx, 'OK')
-            already_seen_paths.add(path)
+            already_seen_paths.add(path_str)
             self.set_cell_valid(item, path_idx, item_is_valid)
             return item_is_valid
         
-        for i in range(0, self.page.library_mappings_tw.topLevelItemCount):
-            item = self.page.library_mappings_tw.topLevelItem(i)
-            path_idx = 1
-            status_idx = 2
-            lib_name = item.text(0)
-            self.set_cell_valid(item, 0, bool(lib_name.strip() != ''))
-            path = self.page.library_mappings_tw.itemWidget(item, path_idx).path  # FileSelectorWidget
-            path = expand_path(path)
-            if not path.is_absolute():
-                path = self.lib_path.parent / path
-            if not update_path_status(item=item, path_idx=1, status_idx=status_idx, path=path):
-                valid=False
+        library_rows = self.library_rows()
+        include_rows = self.include_rows()
+        self.prefetch_stats([self.resolve_row_path(r[2]) for r in library_rows] + 
+                            [self.resolve_row_path(r[1]) for r in include_rows])
+        
+        trees = (self.page.library_mappings_tw, self.page.includes_tw)
+        
+        # NOTE: status texts and backgrounds of all rows change in one batch
+        for tree in trees:
+            tree.setUpdatesEnabled(False)
+        try:
+            libraries_marked = False
+            for item, lib_name, lib_path_str in library_rows:
+                path_idx = 1
+                status_idx = 2
+                lib_name_valid = bool(lib_name and not lib_name.isspace())
+                self.set_cell_valid(item, 0, lib_name_valid)
+                if not lib_name_valid:
+                    libraries_marked = True
+                path = self.resolve_row_path(lib_path_str)
+                if not update_path_status(item=item, path_idx=path_idx, status_idx=status_idx, path=path):
+                    valid=False
+                    libraries_marked = True
             
-        for i in range(0, self.page.includes_tw.topLevelItemCount):
-            item = self.page.includes_tw.topLevelItem(i)
-            path_idx = 0
-            status_idx = 1
-            path = self.page.includes_tw.itemWidget(item, path_idx).path  # FileSelectorWidget
-            path = expand_path(path)
-            if not path.is_absolute():
-                path = self.lib_path.parent / path
-            if not update_path_status(item=item, path_idx=path_idx, status_idx=status_idx, path=path):
-                valid=False
-            else:
-                try:
-                    cfg = LibraryMapConfig.read_json(path)
-                except Exception as ex:
-                    item.setText(status_idx, f"Unreadable: {ex}")
-                    self.set_cell_valid(item, path_idx, False)
-                    continue
-                issues = LibraryMapIssues()
-                libs = cfg.effective_library_definitions(base_folder=path.parent, issues=issues)
-                if issues.failed_libraries or issues.failed_includes:
-                    item.setText(status_idx, f"Missing files!")
-                    item.setToolTip(status_idx, issues.rich_text())
-                    self.set_cell_valid(item, path_idx, False)
-                    continue
-        
-        # clear selection, otherwise the red indication could be hidden
-        self.page.library_mappings_tw.clearSelection()
-        self.page.includes_tw.clearSelection()
+            includes_marked = False
+            for item, include_path_str in include_rows:
+                path_idx = 0
+                status_idx = 1
+                path = self.resolve_row_path(include_path_str)
+                if not update_path_status(item=item, path_idx=path_idx, status_idx=status_idx, path=path):
+                    valid=False
+                    includes_marked = True
+                elif not self.start_include_check(item=item, path_idx=path_idx, status_idx=status_idx, path=path):
+                    includes_marked = True
+            
+            # clear selection, otherwise the red indication could be hidden
+            # NOTE: only where something is marked red, as clearing emits itemSelectionChanged
+            if libraries_marked:
+                self.page.library_mappings_tw.clearSelection()
+            if includes_marked:
+                self.page.includes_tw.clearSelection()
+        finally:
+            for tree in trees:
+                tree.setUpdatesEnabled(True)  # NOTE: implies a repaint
         
+        # NOTE: the loops above touch the name cells, which also emits itemChanged
+        self._validation_dirty = False
+        self._last_validation_result = valid
         return valid
     
     def config_from_ui(self) -> LibraryMapConfig:
         statements = []
         
-        for i in range(0, self.page.library_mappings_tw.topLevelItemCount):
-            item = self.page.library_mappings_tw.topLevelItem(i)
-            lib_name = item.text(0)
-            lib_path_str = self.page.library_mappings_tw.itemWidget(item, 1).path  # FileSelectorWidget
+        for _item, lib_name, lib_path_str in self.library_rows():
             lib_path = Path(lib_path_str)
             statements.append(LibraryDefinition(lib_name, lib_path))
         
-        for i in range(0, self.page.includes_tw.topLevelItemCount):
-            item = self.page.includes_tw.topLevelItem(i)
-            include_path_str = self.page.includes_tw.itemWidget(item, 0).path  # FileSelectorWidget
+        for _item, include_path_str in self.include_rows():
             include_path = Path(include_path_str)
             statements.append(LibraryMapInclude(include_path))
         
@@ -356,21 +737,29 @@ class LibraryManagerDialog(pya.QDialog):
                                 statements=statements)
     
     def remove_selected_items(self, tree: pya.QTreeView):
-        for item in tree.selectedItems():
+        self._validation_dirty = True
+        selected_items = tree.selectedItems()
+        self.drop_pending_include_checks(selected_items)
+        top_level_indices = []
+        for item in selected_items:
             parent = item.parent()
             if parent is None:
                 # Item is top-level
-                idx = tree.indexOfTopLevelItem(item)
-                tree.takeTopLevelItem(idx)
+                top_level_indices.append(tree.indexOfTopLevelItem(item))
             else:
                 # Item has a parent
                 idx = parent.indexOfChild(item)
                 parent.takeChild(idx)
+        
+        # NOTE: take from the back, so the remaining indices stay valid
+        for idx in sorted(top_level_indices, reverse=True):
+            tree.takeTopLevelItem(idx)
     
     def on_add_library(self):
         if Debugging.DEBUG:
             debug("LibraryManagerDialog.on_add_library")
-        self.add_library_tree_row(lib_name='', lib_path='')
+        item = self.add_library_tree_row(lib_name='', lib_path='')
+        self.page.library_mappings_tw.editItem(item, 1)
     
     def on_remove_library(self):
         if Debugging.DEBUG:
@@ -380,7 +769,8 @@ class LibraryManagerDialog(pya.QDialog):
     def on_add_include(self):
         if Debugging.DEBUG:
             debug("LibraryManagerDialog.on_add_include")
-        self.add_includes_tree_row(include_path='')
+        item = self.add_includes_tree_row(include_path='')
+        self.page.includes_tw.editItem(item, 0)
     
     def on_remove_include(self):
         if Debugging.DEBUG:
@@ -390,14 +780,15 @@ class LibraryManagerDialog(pya.QDialog):
     def on_library_selection_changed(self):
         if Debugging.DEBUG:
             debug("LibraryManagerDialog.on_library_selection_changed")
-        selected = self.page.library_mappings_tw.selectedItems()
-        self.page.library_remove_pb.setEnabled(bool(selected))
+        # NOTE: hasSelection avoids building the list of selected items
+        has_selection = self.page.library_mappings_tw.selectionModel.hasSelection()
+        self.page.library_remove_pb.setEnabled(has_selection)
 
     def on_include_selection_changed(self):
         if Debugging.DEBUG:
             debug("LibraryManagerDialog.on_include_selection_changed")
-        selected = self.page.includes_tw.selectedItems()
-        self.page.include_remove_pb.setEnabled(bool(selected))
+        has_selection = self.page.includes_tw.selectionModel.hasSelection()
+        self.page.include_remove_pb.setEnabled(has_selection)
 
     def on_reset(self):
         if Debugging.DEBUG:
@@ -407,21 +798,43 @@ class LibraryManagerDialog(pya.QDialog):
             self.update_ui_from_config(self.layout_path, self.lib_path, self.config)    
         except Exception as e:
             print("LibraryManagerDialog.on_reset caught an exception", e)
-            traceback.print_exc()
-        
+            if Debugging.DEBUG:
+                traceback.print_exc()
+        
+    def commit_config(self) -> bool:
+        """
+        Validates the UI and writes the resulting library map, returns False if invalid
+        
+        NOTE: a config equal to the loaded or last written one (e.g. OK without edits,
+              or Apply followed by OK) is not written again
+        """
+        # NOTE: the stat cache only spares the debounced validation passes while editing,
+        #       files may have been created/removed since, so OK/Apply must look again
+        self._stat_cache.clear()
+        self._include_check_results.clear()
+        
+        if not self.validate_ui_inputs(force=True):
+            return False
+        
+        config = self.config_from_ui()
+        if config != self._unmodified_config:
+            config.write_json(self.lib_path)
+            self.config = config
+            self.written_config = config
+            self._unmodified_config = config
+        return True
+    
     def on_ok(self):
         if Debugging.DEBUG:
             debug("LibraryManagerDialog.on_ok")
         
         try:
-            if not self.validate_ui_inputs():
+            if not self.commit_config():
                 return
-            
-            self.config = self.config_from_ui()
-            self.config.write_json(self.lib_path)
         except Exception as e:
             print("LibraryManagerDialog.on_ok caught an exception", e)
-            traceback.print_exc()
+            if Debugging.DEBUG:
+                traceback.print_exc()
         
         self.accept()
 
@@ -430,14 +843,11 @@ class LibraryManagerDialog(pya.QDialog):
             debug("AutoBackupConfigPage.on_apply")
 
         try:
-            if not self.validate_ui_inputs():
-                return
-                
-            self.config = self.config_from_ui()
-            self.config.write_json(self.lib_path)
+            self.commit_config()
         except Exception as e:
             print("LibraryManagerDialog.on_apply caught an exception", e)
-            traceback.print_exc()
+            if Debugging.DEBUG:
+                traceback.print_exc()
         
     def on_cancel(self):
         if Debugging.DEBUG:
@@ -17,10 +17,10 @@
 #--------------------------------------------------------------------------------
 
 from __future__ import annotations
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 import os
 from pathlib import Path
-import shutil
 import traceback
 from typing import *
 
@@ -47,6 +47,9 @@ from library_map_config import (
     LibraryDefinition, 
     LibraryMapInclude,
     LibraryMapIssues,
+    read_library_map_cached,
+    stat_signature,
+    write_library_map_cached,
 )
 from library_manager_dialog import LibraryManagerDialog
 from new_hierarchical_layout_dialog import NewHierarchicalLayoutDialog, LibraryMapCreationMode
@@ -57,30 +60,144 @@ path_containing_this_script = os.path.realpath(os.path.dirname(__file__))
 
 #--------------------------------------------------------------------------------
 
-@dataclass
+# NOTE: added in KLayout 0.30.5 API
+LIBRARY_SUPPORTS_RENAME = hasattr(pya.Library, 'rename')
+LIBRARY_SUPPORTS_UNREGISTER = hasattr(pya.Library, 'unregister')
+
+#--------------------------------------------------------------------------------
+
+GENERATED_LIBRARY_MAP_COMMENT = "Automatically generated by 'KLayout Library Manager Plugin "  # TODO: add version
+
+# NOTE: missing/unreadable file, malformed JSON (ValueError) or unexpected structure
+LIBRARY_MAP_READ_ERRORS = (OSError, ValueError, TypeError, KeyError)
+
+# NOTE: shared informative texts of the error message boxes, filled in via str.format
+LIBRARY_MAP_READ_FAILED_TEXT = "The library map file could not be read: <pre>{}</pre>"
+TEMPLATE_LIBRARY_MAP_READ_FAILED_TEXT = "The template library file could not be read: <pre>{}</pre>"
+LAYOUT_NOT_HIERARCHICAL_TEXT = "The current layout is not hierarchical: <pre>{}</pre>"
+
+_library_map_read_error_mbox: Optional[pya.QMessageBox] = None
+
+
+def show_library_map_read_error(title: str, text: str, informative_text: str):
+    """
+    Like qmessagebox_critical, but reuses a single message box
+    for the (repeated) library map read errors
+    """
+    global _library_map_read_error_mbox
+    if _library_map_read_error_mbox is None:
+        mbox = pya.QMessageBox(pya.MainWindow.instance())
+        mbox.setIcon(pya.QMessageBox.Critical)
+        mbox.setTextFormat(pya.Qt.RichText)
+        mbox.setStandardButtons(pya.QMessageBox.Ok)
+        _library_map_read_error_mbox = mbox
+    mbox = _library_map_read_error_mbox
+    mbox.setWindowTitle(title)
+    mbox.text = text
+    mbox.informativeText = informative_text
+    mbox.exec_()
+
+#--------------------------------------------------------------------------------
+
+# NOTE: library name -> (path, stat signature) of the file it was last (re)loaded from
+_loaded_library_signatures: Dict[str, Tuple[str, Optional[Tuple[int, int]]]] = {}
+
+_library_prefetch_executor: Optional[ThreadPoolExecutor] = None
+
+
+def library_prefetch_executor() -> ThreadPoolExecutor:
+    global _library_prefetch_executor
+    if _library_prefetch_executor is None:
+        _library_prefetch_executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), 
+                                                        thread_name_prefix='LibraryPrefetch')
+    return _library_prefetch_executor
+
+
+def prefetch_library_file(path: Path):
+    """
+    Pulls a library file into the OS page cache
+    
+    NOTE: runs on a worker thread, therefore must not touch any pya objects
+    """
+    try:
+        with open(path, 'rb') as f:
+            if hasattr(os, 'posix_fadvise'):
+                # NOTE: let the kernel read ahead asynchronously, without copying the data here
+                fd = f.fileno()
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            else:
+                while f.read(1 << 20):
+                    pass
+    except OSError:
+        pass  # NOTE: reported by the actual read on the UI thread
+
+
+def prefetch_library_files(lib_defs: List[LibraryDefinition]):
+    """
+    Reads library files ahead on worker threads,
+    while Layout.read parses them one after the other on the UI thread
+    """
+    executor = library_prefetch_executor()
+    for lib_def in lib_defs:
+        executor.submit(prefetch_library_file, lib_def.lib_path)
+
+#--------------------------------------------------------------------------------
+
+def select_layout_file_path(parent: pya.QWidget,
+                            caption: str,
+                            directory: str,
+                            filter: str,
+                            save: bool) -> Optional[str]:
+    """
+    Replacement for QFileDialog.getOpenFileName/getSaveFileName
+    
+    NOTE: the Qt (non-native) dialog lists the directory lazily, 
+          the native ones stat every file to evaluate the filter, 
+          which is perceptibly slow for large (network) directories
+    """
+    dialog = pya.QFileDialog(parent, caption, directory or '', filter)
+    dialog.setOption(pya.QFileDialog.DontUseNativeDialog, True)
+    if save:
+        dialog.setAcceptMode(pya.QFileDialog.AcceptSave)
+    else:
+        dialog.setAcceptMode(pya.QFileDialog.AcceptOpen)
+        dialog.setFileMode(pya.QFileDialog.ExistingFile)
+    try:
+        if dialog.exec_() != pya.QDialog.Accepted:
+            return None
+        files = dialog.selectedFiles()
+        return files[0] if files else None
+    finally:
+        dialog._destroy()
+
+
+@dataclass(frozen=True, slots=True)
 class LayoutFileSet:
     layout_path: Path
+    lib_path: Path = field(init=False)
+    
+    def __post_init__(self):
+        # NOTE: computed once, handlers access it several times
+        #       (frozen, therefore bypassing __setattr__)
+        object.__setattr__(self, 'lib_path', self.layout_path.with_suffix(LIBRARY_MAP_FILE_SUFFIX))
 
     @classmethod
-    def active(cls) -> Optional[LayoutFileSet]:
-        cv = pya.CellView.active()
+    def active(cls, cv: Optional[pya.CellView] = None) -> Optional[LayoutFileSet]:
+        if cv is None:
+            cv = pya.CellView.active()
         if cv.is_valid():
             return LayoutFileSet(Path(cv.filename()))
         return None
-    
-    @property
-    def lib_path(self) -> Path:
-        path = self.layout_path.with_suffix(LIBRARY_MAP_FILE_SUFFIX)
-        return path
 
     def load_config(self, msg: str) -> Optional[LibraryMapConfig]:
         try:
-            config = LibraryMapConfig.read_json(self.lib_path)
-            return config
-        except:
-            qmessagebox_critical('Error', msg, 
-                f"The library map file could not be read: "\
-                f"<pre>{str(self.lib_path)}</pre>"
+            return read_library_map_cached(self.lib_path)
+        except LIBRARY_MAP_READ_ERRORS as e:
+            if Debugging.DEBUG:
+                debug(f"LayoutFileSet.load_config failed for {self.lib_path}: {e}")
+            show_library_map_read_error('Error', msg, 
+                LIBRARY_MAP_READ_FAILED_TEXT.format(os.fspath(self.lib_path))
             )
             return None
 
@@ -93,6 +210,15 @@ class LibraryMapIssueConsequence(StrEnum):
     EDIT_MAP = "edit_map"
     CLOSE_LAYOUT = "close_layout"
 
+
+# NOTE: indexed by the clicked button of the library map issue message box
+ISSUE_CONSEQUENCE_BY_BUTTON: Tuple[LibraryMapIssueConsequence, ...] = (
+    LibraryMapIssueConsequence.LOAD_NOTHING,
+    LibraryMapIssueConsequence.CLOSE_LAYOUT,
+    LibraryMapIssueConsequence.EDIT_MAP,
+    LibraryMapIssueConsequence.LOAD_LOADABLES,
+)
+
 #--------------------------------------------------------------------------------
 
 
@@ -101,19 +227,30 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
         super().__init__()
                 
         self.has_tool_entry = False
+        self._save_in_progress = False
+        self._issue_mbox: Optional[pya.QMessageBox] = None
+        # NOTE: key is (write_context_info, recompress)
+        self._save_layout_options: Dict[Tuple[bool, bool], pya.SaveLayoutOptions] = {}
+        
+        # NOTE: dialogs are created on first use and reused afterwards
+        self.new_hierarchical_layout_dialog: Optional[NewHierarchicalLayoutDialog] = None
+        self.library_manager_dialog: Optional[LibraryManagerDialog] = None
         self.register(-1000, "library_manager", "Library Manager")
         
         try:
             self.setup()
         except Exception as e:
             print("LibraryManagerPluginFactory.ctor caught an exception", e)
-            traceback.print_exc()
+            if Debugging.DEBUG:
+                traceback.print_exc()
     
     def setup(self):
+        # NOTE: the main window is a singleton, no need to look it up in every handler
+        self._mw = pya.MainWindow.instance()
         self.add_menu_actions()
         
     def add_menu_actions(self):
-        mw = pya.MainWindow.instance()
+        mw = self._mw
         menu = mw.menu()
         
         action_new_hierarchical_layout = pya.Action()
@@ -161,15 +298,24 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
             'reload_cell_libraries': action_reload_cell_libraries,
         }
         
-        # Remove existing commands
-        for name, action in self.actions_by_name.items():
-            path = f"file_menu.{name}"
-            menu.delete_item(path)
-        menu.delete_item('file_menu.hierarchical_layout_separator')
+        # NOTE: fetch the file menu items only once,
+        #       the insertion index is derived from the same list
+        file_menu_items = menu.items('file_menu')
         
         # Locate the separator after the 'New …' commands
-        file_menu_items = menu.items('file_menu')
         idx = file_menu_items.index('file_menu.open')
+        
+        # Remove existing commands (e.g. when the macros are reloaded)
+        existing_paths = {path: i for i, path in enumerate(file_menu_items)}
+        own_paths = [f"file_menu.{name}" for name in self.actions_by_name.keys()] + \
+                    ['file_menu.hierarchical_layout_separator']
+        for path in own_paths:
+            i = existing_paths.get(path, None)
+            if i is None:
+                continue
+            menu.delete_item(path)
+            if i < idx:
+                idx -= 1
 
         menu.insert_separator(f"file_menu.#{idx}", "hierarchical_layout_separator")
 
@@ -180,8 +326,11 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
         if Debugging.DEBUG:
             debug("LibraryManagerPluginFactory.on_new_hierarchical_layout")
 
-        mw = pya.MainWindow.instance()        
-        self.new_hierarchical_layout_dialog = NewHierarchicalLayoutDialog(mw)
+        mw = self._mw
+        if self.new_hierarchical_layout_dialog is None:
+            self.new_hierarchical_layout_dialog = NewHierarchicalLayoutDialog(mw)
+        else:
+            self.new_hierarchical_layout_dialog.reset_fields()
         self.new_hierarchical_layout_dialog.exec_()
         
         config = self.new_hierarchical_layout_dialog.get_config()
@@ -190,12 +339,13 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
         
         def validate_library_map_template() -> bool:
             try:
-                map_cfg = LibraryMapConfig.read_json(config.library_map_template_path)
+                read_library_map_cached(config.library_map_template_path)
                 return True
-            except:
-                qmessagebox_critical('Error', 'New layout creation failed', 
-                    f"The template library file could not be read: "\
-                    f"<pre>{str(config.library_map_template_path)}</pre>"
+            except LIBRARY_MAP_READ_ERRORS as e:
+                if Debugging.DEBUG:
+                    debug(f"validate_library_map_template failed for {config.library_map_template_path}: {e}")
+                show_library_map_read_error('Error', 'New layout creation failed', 
+                    TEMPLATE_LIBRARY_MAP_READ_FAILED_TEXT.format(os.fspath(config.library_map_template_path))
                 )
                 return False
         
@@ -205,24 +355,24 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
         
         layout_file_set = LayoutFileSet(config.save_path)
         
-        map_cfg = LibraryMapConfig(
-            technology=config.tech_name,
-            statements=[
-                LibraryMapComment(f"Automatically generated by 'KLayout Library Manager Plugin ") # TODO: add version   
-            ]
-        )
+        def generated_map_config(statements: List[LibraryMapStatement]) -> LibraryMapConfig:
+            return LibraryMapConfig(
+                technology=config.tech_name,
+                statements=[LibraryMapComment(GENERATED_LIBRARY_MAP_COMMENT)] + statements
+            )
         
         match config.library_map_creation_mode:
             case LibraryMapCreationMode.CREATE_EMPTY:
-                map_cfg.write_json(layout_file_set.lib_path)
+                map_cfg = generated_map_config([])
+                write_library_map_cached(map_cfg, layout_file_set.lib_path)
                     
             case LibraryMapCreationMode.LINK_TEMPLATE:
                 if not validate_library_map_template():
                     return
                 abbrev_path = LibraryMapConfig.abbreviate_path(path=config.library_map_template_path,
-                                                               base_folder=layout_file_set.parent)
-                map_cfg.statements.append(LibraryMapInclude(abbrev_path))
-                map_cfg.write_json(layout_file_set.lib_path)
+                                                               base_folder=layout_file_set.lib_path.parent)
+                map_cfg = generated_map_config([LibraryMapInclude(abbrev_path)])
+                write_library_map_cached(map_cfg, layout_file_set.lib_path)
                 
             case LibraryMapCreationMode.COPY_TEMPLATE:
                 if not validate_library_map_template():
@@ -247,11 +397,13 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
     
             cell = layout.create_cell(config.top_cell)
             cv.cell = cell
+            lv = cv.view()
             
+            # NOTE: only scan for missing layer views if there are layers at all
             if config.initial_layers.layers:
                 for li in config.initial_layers.layers:
                     layout.layer(li)
-                cv.view().add_missing_layers()
+                lv.add_missing_layers()
             
             if config.dbu_um is not None:
                 layout.dbu = config.dbu_um
@@ -261,11 +413,52 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
             layout.add_meta_info(meta_info)
             
             self.save_hierarchical_layout(layout_path=config.save_path, write_context_info=True)
-            cv.view().zoom_box(pya.DBox(0.001, config.initial_window_um or 2.0))
+            # NOTE: the layout is still empty, so this only sets the initial window
+            #       (zoom_fit would not honor the configured initial window size)
+            lv.zoom_box(pya.DBox(0.001, config.initial_window_um or 2.0))
 
         self.reload_cell_libraries(layout_file_set, map_cfg, retry_block=on_cell_libraries_loaded)
 
-    def save_hierarchical_layout(self, layout_path: Path, write_context_info: bool):
+    def save_layout_options(self, 
+                            layout_path_str: str, 
+                            write_context_info: bool, 
+                            recompress: bool) -> pya.SaveLayoutOptions:
+        """
+        Returns the reused save options for the given flags,
+        only the format is updated for each path
+        """
+        key = (write_context_info, recompress)
+        o = self._save_layout_options.get(key, None)
+        if o is None:
+            o = pya.SaveLayoutOptions()
+            o.oasis_recompress = recompress
+            o.oasis_permissive = True
+            # NOTE: these select modes, they do not snapshot the current cells/layers
+            o.select_all_cells()
+            o.select_all_layers()
+            
+            # NOTE: 
+            #   - for regular "save as…", we want the context info
+            #   - for final tapeout export, we don't want the context info
+            #       - as some online DRC checker will fail when they see the context info
+            o.write_context_info = write_context_info
+            self._save_layout_options[key] = o
+        o.set_format_from_filename(layout_path_str)
+        return o
+    
+    def save_hierarchical_layout(self, layout_path: Path, write_context_info: bool, recompress: bool = False):
+        """
+        Saves the active layout, 
+        the costly OASIS recompression pass only runs with recompress=True
+        (tapeout export writes its own file and always recompresses)
+        """
+        # NOTE: KLayout keeps processing events while its save progress is shown,
+        #       so the save action could be triggered again before this one finishes
+        if self._save_in_progress:
+            if Debugging.DEBUG:
+                debug("LibraryManagerPluginFactory.save_hierarchical_layout: save already in progress, ignoring")
+            return
+        
         cv = pya.CellView.active()
         if cv is None:
             return
@@ -273,45 +466,43 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
         layout = cv.layout()
         if not self.validate_layout_is_hierarchical(layout, 'Opening Library Manager failed'):
             return
+        
+        # NOTE: nothing to write if the layout is unchanged and saved to its own file
+        if not cv.is_dirty() and Path(cv.filename()) == layout_path:
+            if Debugging.DEBUG:
+                debug("LibraryManagerPluginFactory.save_hierarchical_layout: layout unchanged, skipping")
+            return
     
-        o = pya.SaveLayoutOptions()
-        o.oasis_recompress = True
-        o.oasis_permissive = True
-        o.select_all_cells()
-        o.select_all_layers()
-        o.set_format_from_filename(str(layout_path))
-
-        # NOTE: 
-        #   - for regular "save as…", we want the context info
-        #   - for final tapeout export, we don't want the context info
-        #       - as some online DRC checker will fail when they see the context info
-        o.write_context_info = write_context_info   
+        layout_path_str = os.fspath(layout_path)
+        o = self.save_layout_options(layout_path_str, write_context_info, recompress)
         
         lv = cv.view()
-        lv.save_as(lv.active_cellview_index, str(layout_path), o)
+        self._save_in_progress = True
+        try:
+            lv.save_as(lv.active_cellview_index, layout_path_str, o)
+        finally:
+            self._save_in_progress = False
         
     def save_layout_and_library(self, 
                                 layout_file_set: LayoutFileSet, 
                                 config: LayoutMapConfig,
-                                write_context_info: bool):
+                                write_context_info: bool,
+                                recompress: bool = False):
         if Debugging.DEBUG:
             debug("LibraryManagerPluginFactory.save_layout_and_library")
             
-        self.save_hierarchical_layout(layout_file_set.layout_path, write_context_info)
-        config.write_json(layout_file_set.lib_path)
+        self.save_hierarchical_layout(layout_file_set.layout_path, write_context_info, recompress)
+        write_library_map_cached(config, layout_file_set.lib_path)
         
     def validate_layout_is_hierarchical(self, layout: pya.Layout, topic: str) -> bool:
         if Debugging.DEBUG:
             debug("LibraryManagerPluginFactory.validate_layout_is_hierarchical")
 
-        mw = pya.MainWindow.instance()        
-        cv = pya.CellView.active()
-
         # check if this is a hierarchical layout
         if layout.meta_info_value('Hierarchical Layout') is None:
+            cv = pya.CellView.active()  # NOTE: only needed for the error message
             qmessagebox_critical('Error', topic, 
-                f"The current layout is not hierarchical: "\
-                f"<pre>{cv.filename()}</pre>"
+                LAYOUT_NOT_HIERARCHICAL_TEXT.format(cv.filename())
             )
             return False
         return True
@@ -320,43 +511,45 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
         if not issues.failed_libraries and not issues.failed_includes:
             return LibraryMapIssueConsequence.NONE
     
-        mbox = pya.QMessageBox()
-        mbox.setIcon(pya.QMessageBox.Critical)
-        mbox.setWindowTitle('Library Map Error')
-        mbox.setTextFormat(pya.Qt.RichText)
-        mbox.setText(issues.rich_text())
-        
-        cancel_button = mbox.addButton("Cancel", pya.QMessageBox.RejectRole)
-        close_button = mbox.addButton("Close Layout", pya.QMessageBox.DestructiveRole)
-        edit_button = mbox.addButton("Edit Map", pya.QMessageBox.ActionRole)
-        ignore_button = mbox.addButton("Ignore", pya.QMessageBox.AcceptRole)
-        
-        result = mbox.exec_()
-        match result:
-            case 0: return LibraryMapIssueConsequence.LOAD_NOTHING
-            case 1: return LibraryMapIssueConsequence.CLOSE_LAYOUT
-            case 2: return LibraryMapIssueConsequence.EDIT_MAP
-            case 3: return LibraryMapIssueConsequence.LOAD_LOADABLES
-            case _: raise NotImplementedError()
+        # NOTE: the message box is built once and reused for later reports
+        if self._issue_mbox is None:
+            mbox = pya.QMessageBox()
+            mbox.setIcon(pya.QMessageBox.Critical)
+            mbox.setWindowTitle('Library Map Error')
+            mbox.setTextFormat(pya.Qt.RichText)
+            
+            cancel_button = mbox.addButton("Cancel", pya.QMessageBox.RejectRole)
+            close_button = mbox.addButton("Close Layout", pya.QMessageBox.DestructiveRole)
+            edit_button = mbox.addButton("Edit Map", pya.QMessageBox.ActionRole)
+            ignore_button = mbox.addButton("Ignore", pya.QMessageBox.AcceptRole)
+            self._issue_mbox = mbox
+        
+        self._issue_mbox.setText(issues.rich_text())
+        result = self._issue_mbox.exec_()
+        if not 0 <= result < len(ISSUE_CONSEQUENCE_BY_BUTTON):
+            raise NotImplementedError()
+        return ISSUE_CONSEQUENCE_BY_BUTTON[result]
     
     def on_load_hierarchical_layout(self):
         if Debugging.DEBUG:
             debug("LibraryManagerPluginFactory.on_load_hierarchical_layout")
         
-        mw = pya.MainWindow.instance()        
+        mw = self._mw
         
         try:
             lru_path = FileSystemHelpers.least_recent_directory()
         
-            layout_path_str = pya.QFileDialog.getOpenFileName(
+            layout_path_str = select_layout_file_path(
                 mw,
                 "Select Hierarchical Layout File",
                 lru_path,
-                f"{HIERARCHICAL_LAYOUT_FILE_FILTER};;All Files (*)"
+                f"{HIERARCHICAL_LAYOUT_FILE_FILTER};;All Files (*)",
+                save=False
             )
         
             if layout_path_str:
                 layout_path = Path(layout_path_str)
+                FileSystemHelpers.set_least_recent_directory(layout_path.parent)
             
                 layout_file_set = LayoutFileSet(layout_path)
                 config = layout_file_set.load_config('Opening Hierarchical Layout failed')
@@ -369,13 +562,14 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
                 mw.create_view()
                 
                 def on_cell_libraries_loaded():
-                    mw.load_layout(str(layout_path), 0)
+                    mw.load_layout(os.fspath(layout_path), 0)
                 
                 self.reload_cell_libraries(layout_file_set, config, retry_block=on_cell_libraries_loaded)
                 
         except Exception as e:
-            print("NewHierarchicalLayoutDialog.on_browse_save_path caught an exception", e)
-            traceback.print_exc()
+            print("LibraryManagerPluginFactory.on_load_hierarchical_layout caught an exception", e)
+            if Debugging.DEBUG:
+                traceback.print_exc()
         
     def on_save_hierarchical_layout(self):
         if Debugging.DEBUG:
@@ -396,19 +590,20 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
                                          write_context_info=True)
         except Exception as e:
             print("LibraryManagerPluginFactory.on_save_hierarchical_layout caught an exception", e)
-            traceback.print_exc()
+            if Debugging.DEBUG:
+                traceback.print_exc()
 
     def on_save_as_hierarchical_layout(self):
         if Debugging.DEBUG:
             debug("LibraryManagerPluginFactory.on_save_as_hierarchical_layout")
             
         try:
-            layout_file_set = LayoutFileSet.active()
+            cv = pya.CellView.active()
+            layout_file_set = LayoutFileSet.active(cv)
             if layout_file_set is None:
                 qmessagebox_critical('Error', 'Save As failed', 'No view open to save')
                 return
                 
-            cv = pya.CellView.active()
             layout = cv.layout()
             if not self.validate_layout_is_hierarchical(layout, 'Save Hierarchical Layout failed'):
                 return
@@ -419,18 +614,19 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
             
             lru_path = FileSystemHelpers.least_recent_directory()
             
-            mw = pya.MainWindow.instance()
+            mw = self._mw
             
-            layout_path_str = pya.QFileDialog.getSaveFileName(
+            layout_path_str = select_layout_file_path(
                 mw,               
                 "Select Layout File Path",
                 lru_path,                 # starting dir ("" = default to last used / home)
-                f"{HIERARCHICAL_LAYOUT_FILE_FILTER};;All Files (*)"
+                f"{HIERARCHICAL_LAYOUT_FILE_FILTER};;All Files (*)",
+                save=True
             )
         
             if layout_path_str:
                 layout_path = Path(layout_path_str)
-                if ''.join(layout_path.suffixes).lower() not in HIERARCHICAL_LAYOUT_FILE_SUFFIXES:
+                if not layout_path_str.lower().endswith(HIERARCHICAL_LAYOUT_FILE_SUFFIXES):
                     layout_path = layout_path.with_suffix(HIERARCHICAL_LAYOUT_FILE_SUFFIXES[0])
                 
                 FileSystemHelpers.set_least_recent_directory(layout_path.parent)
@@ -444,23 +640,22 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
                                              write_context_info=True)
         except Exception as e:
             print("LibraryManagerPluginFactory.on_save_as_hierarchical_layout caught an exception", e)
-            traceback.print_exc()
+            if Debugging.DEBUG:
+                traceback.print_exc()
     
     def on_export_hierarchical_layout_for_tapeout(self):
         if Debugging.DEBUG:
             debug("LibraryManagerPluginFactory.on_export_hierarchical_layout_for_tapeout")
             
-        succeeded = False
         layout_path = None
-        caught_exception = None
             
         try:
-            layout_file_set = LayoutFileSet.active()
+            cv = pya.CellView.active()
+            layout_file_set = LayoutFileSet.active(cv)
             if layout_file_set is None:
                 qmessagebox_critical('Error', 'Export failed', 'No view open to save')
                 return
                 
-            cv = pya.CellView.active()
             layout = cv.layout()
             if not self.validate_layout_is_hierarchical(layout, 'Export Hierarchical Layout failed'):
                 return
@@ -471,13 +666,14 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
             
             lru_path = FileSystemHelpers.least_recent_directory()
             
-            mw = pya.MainWindow.instance()
+            mw = self._mw
             
-            layout_path_str = pya.QFileDialog.getSaveFileName(
+            layout_path_str = select_layout_file_path(
                 mw,               
                 "Select Layout File Path",
                 lru_path,                 # starting dir ("" = default to last used / home)
-                f"{GENERIC_LAYOUT_FILE_FILTER};;All Files (*)"
+                f"{GENERIC_LAYOUT_FILE_FILTER};;All Files (*)",
+                save=True
             )
             
             if not layout_path_str:
@@ -486,63 +682,53 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
             layout_path = Path(layout_path_str)
             
             FileSystemHelpers.set_least_recent_directory(layout_path.parent)
-        
-            o = pya.SaveLayoutOptions()
-            o.oasis_recompress = True
-            o.oasis_permissive = True
-            o.select_all_cells()
-            o.select_all_layers()
-            o.set_format_from_filename(str(layout_path))
-    
-            # NOTE: 
-            #   - for regular "save as…", we want the context info
-            #   - for final tapeout export, we don't want the context info
-            #       - as some online DRC checker will fail when they see the context info
-            o.write_context_info = False
             
-            layout.write(str(layout_path), o)
+            # NOTE: no context info for tapeout, some online DRC checkers fail when they see it
+            o = self.save_layout_options(layout_path_str, write_context_info=False, recompress=True)
             
-            succeeded = True
+            layout.write(layout_path_str, o)
             # raise Exception(f"Test exception")
         except Exception as e:
             print("LibraryManagerPluginFactory.on_export_hierarchical_layout_for_tapeout caught an exception", e)
-            traceback.print_exc()
-            caught_exception = e            
-        finally:
-            if not succeeded and caught_exception is None:  # cancellation
-                return
-            
+            if Debugging.DEBUG:
+                traceback.print_exc()
+            self.finish_export_for_tapeout(layout_path, e)
+            return
+        
+        self.finish_export_for_tapeout(layout_path, None)
+    
+    def finish_export_for_tapeout(self, layout_path: Optional[Path], caught_exception: Optional[Exception]):
+        if caught_exception is None:
             mbox = pya.QMessageBox()
             mbox.setTextFormat(pya.Qt.RichText)
-            if succeeded:
-                mbox.setIcon(pya.QMessageBox.Information)
-                mbox.setWindowTitle('Export For Tapeout Success')
-                mbox.text = "Export for tapeout succeeded."
-                mbox.informativeText = f"The current layout was successfully exported for tapeout to: "\
-                                       f"<pre>{str(layout_path)}</pre>"
-                reveal_button = mbox.addButton("Reveal in File Manager", pya.QMessageBox.ActionRole)
-                ok_button = mbox.addButton("OK", pya.QMessageBox.AcceptRole)
-                    
-                result = mbox.exec_()
-                if result == 0:
-                    FileSystemHelpers.reveal_in_file_manager(layout_path)
-            else:
-                qmessagebox_critical('Export For Tapeout Error', 'Export for tapeout failed.', 
-                    f"Caught Exception: "\
-                    f"<pre>{str(caught_exception)}</pre>"
-                )
+            mbox.setIcon(pya.QMessageBox.Information)
+            mbox.setWindowTitle('Export For Tapeout Success')
+            mbox.text = "Export for tapeout succeeded."
+            mbox.informativeText = f"The current layout was successfully exported for tapeout to: "\
+                                   f"<pre>{str(layout_path)}</pre>"
+            reveal_button = mbox.addButton("Reveal in File Manager", pya.QMessageBox.ActionRole)
+            ok_button = mbox.addButton("OK", pya.QMessageBox.AcceptRole)
+                
+            result = mbox.exec_()
+            if result == 0:
+                FileSystemHelpers.reveal_in_file_manager(layout_path)
+        else:
+            qmessagebox_critical('Export For Tapeout Error', 'Export for tapeout failed.', 
+                f"Caught Exception: "\
+                f"<pre>{str(caught_exception)}</pre>"
+            )
     
     def on_manage_cell_library_map(self):
         if Debugging.DEBUG:
             debug("LibraryManagerPluginFactory.on_manage_cell_library_map")
         
         try:
-            layout_file_set = LayoutFileSet.active()
+            cv = pya.CellView.active()
+            layout_file_set = LayoutFileSet.active(cv)
             if layout_file_set is None:
                 qmessagebox_critical('Error', 'Manage Cell Library Map failed', 'No view open to manage')
                 return
                 
-            cv = pya.CellView.active()
             layout = cv.layout()
             
             if not self.validate_layout_is_hierarchical(layout, 'Opening Library Manager failed'):
@@ -551,7 +737,8 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
             self.manage_cell_library_map(layout_file_set)
         except Exception as e:
             print("LibraryManagerPluginFactory.on_manage_cell_library_map caught an exception", e)
-            traceback.print_exc()
+            if Debugging.DEBUG:
+                traceback.print_exc()
             
     def manage_cell_library_map(self, 
                                 layout_file_set: LayoutFileSet, 
@@ -563,14 +750,19 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
         if old_map_cfg is None:
             return
         
-        mw = pya.MainWindow.instance()
-        self.library_manager_dialog = LibraryManagerDialog(mw)
+        if self.library_manager_dialog is None:
+            mw = self._mw
+            self.library_manager_dialog = LibraryManagerDialog(mw)
+        # NOTE: resets all per-map state of the reused dialog
         self.library_manager_dialog.update_ui_from_config(layout_file_set.layout_path, layout_file_set.lib_path, old_map_cfg)
         result = self.library_manager_dialog.exec_()
         if result != 0:
-            new_map_cfg = layout_file_set.load_config('Manage cell library map failed')
+            # NOTE: the dialog hands over what it has written, no need to parse the file again
+            new_map_cfg = self.library_manager_dialog.written_config
             if new_map_cfg is None:
-                return
+                new_map_cfg = layout_file_set.load_config('Manage cell library map failed')
+                if new_map_cfg is None:
+                    return
             
             base_folder = layout_file_set.layout_path.parent
                     
@@ -592,7 +784,7 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
         if Debugging.DEBUG:
             debug("LibraryManagerPluginFactory.on_reload_cell_libraries")
 
-        mw = pya.MainWindow.instance()
+        mw = self._mw
         
         def report_issues(issues: LibraryMapIssues) -> bool:
             consequence = self.report_library_map_issues(issues)
@@ -603,7 +795,6 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
                     EventLoop.defer(lambda: self.manage_cell_library_map(layout_file_set, retry_block))
                     return False
                 case LibraryMapIssueConsequence.CLOSE_LAYOUT:
-                    mw = pya.MainWindow.instance()
                     EventLoop.defer(mw.close_current_view)
                     return False
                 case LibraryMapIssueConsequence.NONE |\
@@ -614,8 +805,18 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
         if not report_issues(changes.issues):
             return
         
+        # NOTE: the libraries touched below no longer match what reload_cell_libraries recorded,
+        #       drop their records, so the next reload reads them again
+        touched_lib_names = [ld.lib_name for ld in changes.added_libs] + \
+                            [ld.lib_name for ld in changes.removed_libs] + \
+                            [ld.lib_name for pair in changes.renamed_libs + changes.repathed_libs for ld in pair]
+        for lib_name in touched_lib_names:
+            _loaded_library_signatures.pop(lib_name, None)
+        
         loading_issues = LibraryMapIssues()
         
+        prefetch_library_files(changes.added_libs + [new_lib_def for _old_lib_def, new_lib_def in changes.repathed_libs])
+        
         for new_lib_def in changes.added_libs:
             try:
                 lib = pya.Library()
@@ -629,7 +830,7 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
         
         for old_lib_def, new_lib_def in changes.renamed_libs:
             lib = pya.Library.library_by_name(old_lib_def.lib_name)
-            if 'rename' in dir(lib):  # added in KLayout 0.30.5 API
+            if LIBRARY_SUPPORTS_RENAME:
                 lib.rename(new_lib_def.lib_name)
             
         for old_lib_def, new_lib_def in changes.repathed_libs:
@@ -647,7 +848,7 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
         for old_lib_def in changes.removed_libs:
             lib = pya.Library.library_by_name(old_lib_def.lib_name)
             if lib:  # NOTE: due to loading errors, it could be that the library does not yet exist
-                if 'unregister' in dir(pya.Library):  # added in KLayout 0.30.5 API
+                if LIBRARY_SUPPORTS_UNREGISTER:
                     pya.Library.unregister(lib)
     
         if retry_block is not None:
@@ -658,9 +859,6 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
             debug("LibraryManagerPluginFactory.on_reload_cell_libraries")
         
         try:        
-            mw = pya.MainWindow.instance()
-            cv = pya.CellView.active()
-            
             layout_file_set = LayoutFileSet.active()
             if layout_file_set is None:
                 qmessagebox_critical('Error', 'Reload Cell Libraries failed', 'No view open to reload')
@@ -678,7 +876,8 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
             
         except Exception as e:
             print("LibraryManagerPluginFactory.on_reload_cell_libraries caught an exception", e)
-            traceback.print_exc()
+            if Debugging.DEBUG:
+                traceback.print_exc()
 
     def reload_cell_libraries(self, 
                               layout_file_set: LayoutFileSet, 
@@ -687,9 +886,10 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
         if Debugging.DEBUG:
             debug("LibraryManagerPluginFactory.reload_cell_libraries")
         
-        parent_dir = layout_file_set.lib_path.parent
+        # NOTE: LibraryMapConfig caches the result while neither the map nor its dependencies change
         issues = LibraryMapIssues()
-        new_lib_defs = config.effective_library_definitions(base_folder=parent_dir, issues=issues)
+        new_lib_defs = config.effective_library_definitions(base_folder=layout_file_set.lib_path.parent, 
+                                                            issues=issues)
         
         loading_issues = LibraryMapIssues()
         
@@ -702,15 +902,32 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
                     EventLoop.defer(lambda: self.manage_cell_library_map(layout_file_set, retry_block))
                     return False
                 case LibraryMapIssueConsequence.NONE | LibraryMapIssueConsequence.LOAD_LOADABLES:
+                    debug_enabled = Debugging.DEBUG
+                    
+                    # NOTE: libraries already loaded from the unchanged file are kept as they are
+                    pending_lib_defs = []
                     for lib_def in new_lib_defs:
-                        if Debugging.DEBUG:
+                        signature = (os.fspath(lib_def.lib_path), stat_signature(lib_def.lib_path))
+                        if signature[1] is not None and \
+                           _loaded_library_signatures.get(lib_def.lib_name, None) == signature and \
+                           pya.Library.library_by_name(lib_def.lib_name) is not None:
+                            if debug_enabled:
+                                debug(f"Library {lib_def.lib_name} is unchanged, skipping reload")
+                            continue
+                        pending_lib_defs.append((lib_def, signature))
+                    
+                    prefetch_library_files([lib_def for lib_def, _signature in pending_lib_defs])
+                    for lib_def, signature in pending_lib_defs:
+                        if debug_enabled:
                             debug(f"Reload library {lib_def.lib_name} from path {lib_def.lib_path}")
+                        _loaded_library_signatures.pop(lib_def.lib_name, None)
                         lib = pya.Library.library_by_name(lib_def.lib_name)
                         if lib is None:
                             lib = pya.Library()
                             try:
                                 lib.layout().read(lib_def.lib_path)
                                 lib.register(lib_def.lib_name)
+                                _loaded_library_signatures[lib_def.lib_name] = signature
                             except Exception as e:
                                 loading_issues.failed_libraries.append((lib_def, str(e)))
                         else:              
@@ -718,11 +935,12 @@ class LibraryManagerPluginFactory(pya.PluginFactory):
                                 lib.layout().clear()
                                 lib.layout().read(lib_def.lib_path)
                                 lib.refresh()
+                                _loaded_library_signatures[lib_def.lib_name] = signature
                             except Exception as e:
                                 loading_issues.failed_libraries.append((lib_def, str(e)))
                     return True
                 case LibraryMapIssueConsequence.CLOSE_LAYOUT:
-                    mw = pya.MainWindow.instance()
+                    mw = self._mw
                     EventLoop.defer(mw.close_current_view)
                     return False
                 case _:
@@ -19,7 +19,9 @@
 from __future__ import annotations
 from dataclasses import dataclass, asdict, field
 from functools import cached_property
+import os
 from pathlib import Path
+import tempfile
 import traceback
 from typing import *
 import unittest
@@ -32,18 +34,20 @@ from klayout_plugin_utils.debugging import debug, Debugging
 from library_map_config import (
     LibraryMapConfig,
     LibraryDefinition,
+    LibraryMapInclude,
     LibraryMapIssues,
 )
 
 #--------------------------------------------------------------------------------
 
-@dataclass
+# NOTE: no default factories, compare() always passes all fields
+@dataclass(slots=True)
 class LibraryMapChanges:
-    added_libs: List[LibraryDefinition] = field(default_factory=list)
-    removed_libs: List[LibraryDefinition] = field(default_factory=list)
-    renamed_libs: List[Tuple[LibraryDefinition, LibraryDefinition]] = field(default_factory=list)
-    repathed_libs: List[Tuple[LibraryDefinition, LibraryDefinition]] = field(default_factory=list)
-    issues: LibraryMapIssues = field(default_factory=LibraryMapIssues)
+    added_libs: List[LibraryDefinition]
+    removed_libs: List[LibraryDefinition]
+    renamed_libs: List[Tuple[LibraryDefinition, LibraryDefinition]]
+    repathed_libs: List[Tuple[LibraryDefinition, LibraryDefinition]]
+    issues: LibraryMapIssues
 
     @classmethod
     def compare(self, 
@@ -59,35 +63,38 @@ class LibraryMapChanges:
         new_lib_defs = new_config.effective_library_definitions(base_folder, issues)
         old_lib_defs = old_config.effective_library_definitions(base_folder, old_issues)
         
-        old_lib_defs_by_path = {ld.lib_path: ld for ld in old_lib_defs}
-        new_lib_defs_by_path = {ld.lib_path: ld for ld in new_lib_defs}
-        new_lib_defs_by_name = {ld.lib_name: ld for ld in new_lib_defs}
+        # NOTE: keyed by the path strings, hashing/comparing str is cheaper than Path;
+        #       both sides are resolved by the same code, so equal paths have equal strings
+        old_lib_defs_by_path = {os.fspath(ld.lib_path): ld for ld in old_lib_defs}
+        new_lib_defs_by_path = {os.fspath(ld.lib_path): ld for ld in new_lib_defs}
+        
+        removed_paths = old_lib_defs_by_path.keys() - new_lib_defs_by_path.keys()
         
-        added_libs: List[LibraryDefinition] = []
         removed_libs: List[LibraryDefinition] = []
         renamed_libs: List[Tuple[LibraryDefinition, LibraryDefinition]] = []
         repathed_libs: List[Tuple[LibraryDefinition, LibraryDefinition]] = []
         
-        handled_new_lib_defs: Set[LibraryDefinition] = set()
+        # NOTE: only needed to detect repathed libs, i.e. if any old path is gone
+        new_lib_defs_by_name = {ld.lib_name: ld for ld in new_lib_defs} if removed_paths else {}
         
         for path, old_def in old_lib_defs_by_path.items():
-            new_def = new_lib_defs_by_path.get(path, None)
-            if new_def is None:  # lib was removed (or got other path?)
+            if path in removed_paths:  # lib was removed (or got other path?)
                 new_def_for_name = new_lib_defs_by_name.get(old_def.lib_name, None)
                 if new_def_for_name is not None:
                     repathed_libs.append((old_def, new_def_for_name))
-                    handled_new_lib_defs.add(new_def_for_name)
                 else:
                     removed_libs.append(old_def)
             else:
+                new_def = new_lib_defs_by_path[path]
                 if old_def != new_def:
                     renamed_libs.append((old_def, new_def))
-                handled_new_lib_defs.add(new_def)
         
-        for new_def in new_lib_defs:
-            if new_def not in handled_new_lib_defs:
-                handled_new_lib_defs.add(new_def)
-                added_libs.append(new_def)
+        repathed_new_defs = {new_def for _old_def, new_def in repathed_libs}
+        # NOTE: dict.fromkeys drops duplicate definitions, but keeps the map order
+        added_libs: List[LibraryDefinition] = [
+            ld for ld in dict.fromkeys(new_lib_defs)
+            if os.fspath(ld.lib_path) not in old_lib_defs_by_path and ld not in repathed_new_defs
+        ]
         
         return LibraryMapChanges(added_libs=added_libs,
                                  removed_libs=removed_libs,
@@ -97,5 +104,69 @@ class LibraryMapChanges:
         
 #--------------------------------------------------------------------------------
 
+class LibraryMapChangesTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base_folder = Path(self.tmp.name).resolve()
+        for name in ('a.gds', 'b.gds', 'c.gds', 'c2.gds', 'd.gds'):
+            (self.base_folder / name).touch()
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def lib_def(self, lib_name: str, file_name: str) -> LibraryDefinition:
+        return LibraryDefinition(lib_name, self.base_folder / file_name)
+    
+    def test_compare(self):
+        old_config = LibraryMapConfig(technology='sg13g2', statements=[
+            LibraryDefinition('A', Path('a.gds')),
+            LibraryDefinition('B', Path('b.gds')),
+            LibraryDefinition('C', Path('c.gds')),
+        ])
+        new_config = LibraryMapConfig(technology='sg13g2', statements=[
+            LibraryDefinition('A', Path('a.gds')),      # unchanged
+            LibraryDefinition('B_new', Path('b.gds')),  # renamed
+            LibraryDefinition('C', Path('c2.gds')),     # repathed
+            LibraryDefinition('D', Path('d.gds')),      # added
+        ])
+        changes = LibraryMapChanges.compare(self.base_folder, old_config, new_config)
+        self.assertEqual([self.lib_def('D', 'd.gds')], changes.added_libs)
+        self.assertEqual([], changes.removed_libs)
+        self.assertEqual([(self.lib_def('B', 'b.gds'), self.lib_def('B_new', 'b.gds'))], changes.renamed_libs)
+        self.assertEqual([(self.lib_def('C', 'c.gds'), self.lib_def('C', 'c2.gds'))], changes.repathed_libs)
+        self.assertEqual([], changes.issues.failed_libraries)
+    
+    def test_compare__removed(self):
+        old_config = LibraryMapConfig(technology='sg13g2', statements=[
+            LibraryDefinition('A', Path('a.gds')),
+            LibraryDefinition('B', Path('b.gds')),
+        ])
+        new_config = LibraryMapConfig(technology='sg13g2', statements=[
+            LibraryDefinition('A', Path('a.gds')),
+        ])
+        changes = LibraryMapChanges.compare(self.base_folder, old_config, new_config)
+        self.assertEqual([], changes.added_libs)
+        self.assertEqual([self.lib_def('B', 'b.gds')], changes.removed_libs)
+        self.assertEqual([], changes.renamed_libs)
+        self.assertEqual([], changes.repathed_libs)
+    
+    def test_compare__included_libs(self):
+        LibraryMapConfig(technology='sg13g2', statements=[
+            LibraryDefinition('B', Path('b.gds')),
+        ]).write_json(self.base_folder / 'inc.klib')
+        old_config = LibraryMapConfig(technology='sg13g2', statements=[
+            LibraryDefinition('A', Path('a.gds')),
+        ])
+        new_config = LibraryMapConfig(technology='sg13g2', statements=[
+            LibraryDefinition('A', Path('a.gds')),
+            LibraryMapInclude(Path('inc.klib')),
+        ])
+        changes = LibraryMapChanges.compare(self.base_folder, old_config, new_config)
+        self.assertEqual([self.lib_def('B', 'b.gds')], changes.added_libs)
+        self.assertEqual([], changes.removed_libs)
+        self.assertEqual([], changes.issues.failed_includes)
+
+#--------------------------------------------------------------------------------
+
 if __name__ == "__main__":
     unittest.main()
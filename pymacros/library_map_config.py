@@ -17,10 +17,15 @@
 #--------------------------------------------------------------------------------
 
 from __future__ import annotations
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, field
 from functools import cached_property
 import json
+import os
 from pathlib import Path
+import shutil
+import stat
+import sys
+import tempfile
 import traceback
 from typing import *
 import unittest
@@ -33,20 +38,33 @@ from klayout_plugin_utils.event_loop import EventLoop
 from klayout_plugin_utils.json_helpers import JSONEncoderSupportingPaths
 from klayout_plugin_utils.path_helpers import abbreviate_path, expand_path, rebase_relative_path
 
+# NOTE: orjson is optional, KLayout's bundled Python usually does not ship it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 #--------------------------------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class LibraryMapComment:
     comment: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LibraryDefinition:
     lib_name: str
     lib_path: Path
+
+    def __post_init__(self):
+        # NOTE: the same names show up in old/new configs and includes,
+        #       interned names make the by-name lookups pointer compares
+        #       (frozen, therefore bypassing __setattr__)
+        if type(self.lib_name) is str:
+            object.__setattr__(self, 'lib_name', sys.intern(self.lib_name))
     
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LibraryMapInclude:
     include_path: Path
 
@@ -57,28 +75,38 @@ LibraryMapStatement = Union[
     LibraryMapInclude,
 ]
 
+# NOTE: same dicts as dataclasses.asdict would produce, field order included
+STATEMENT_JSON_DICT: Dict[type, Callable[[LibraryMapStatement], Dict[str, Any]]] = {
+    LibraryMapComment: lambda s: {'comment': s.comment},
+    LibraryDefinition: lambda s: {'lib_name': s.lib_name, 'lib_path': s.lib_path},
+    LibraryMapInclude: lambda s: {'include_path': s.include_path},
+}
+
 #--------------------------------------------------------------------------------
 
+LIBRARY_MAP_ISSUES_HEADER = "Detected issues with library map.<br/><br/>"
+
+
 @dataclass
 class LibraryMapIssues:
     failed_libraries: List[Tuple[LibraryDefinition, str]] = field(default_factory=list)
     failed_includes: List[Tuple[LibraryMapInclude, str]] = field(default_factory=list)
 
     def rich_text(self) -> str:
-        msg = "Detected issues with library map.<br/><br/>"
+        parts = [LIBRARY_MAP_ISSUES_HEADER]
         if len(self.failed_libraries) > 0:
-            msg += "Failed libraries:<br/>"
+            parts.append("Failed libraries:<br/>")
             for lib, reason in self.failed_libraries:
-                msg += f"&nbsp;&nbsp;&nbsp;&nbsp;• <i>{lib.lib_name}</i> at <code>{lib.lib_path}</code> "
-                msg += f"<font color='red'>({reason})</font>"
-            msg += "<br/>"
+                parts.append(f"&nbsp;&nbsp;&nbsp;&nbsp;• <i>{lib.lib_name}</i> at <code>{lib.lib_path}</code> "
+                             f"<font color='red'>({reason})</font>")
+            parts.append("<br/>")
         
         if len(self.failed_includes) > 0:
-            msg += "Failed includes:<br/>"
+            parts.append("Failed includes:<br/>")
             for include, reason in self.failed_includes:
-                msg += f"&nbsp;&nbsp;&nbsp;&nbsp;• <i>{include.include_path}</i> "
-                msg += f"<font color='red'>({reason})</font>"
-        return msg
+                parts.append(f"&nbsp;&nbsp;&nbsp;&nbsp;• <i>{include.include_path}</i> "
+                             f"<font color='red'>({reason})</font>")
+        return ''.join(parts)
 
 #--------------------------------------------------------------------------------
 
@@ -97,6 +125,12 @@ class LibraryMapConfig:
             # NOTE: relative paths might no longer work!
             ### rebase_relative_path
             
+            def rebase(path: Path) -> Path:
+                # NOTE: absolute paths stay valid, only relative ones need the (syscall heavy) rebase
+                if Path(path).is_absolute():
+                    return path
+                return rebase_relative_path(path, original_base_folder, new_base_folder)
+            
             new_statements = []
             
             for s in cfg.statements:
@@ -105,42 +139,91 @@ class LibraryMapConfig:
                 elif isinstance(s, LibraryDefinition):
                     new_statements.append(LibraryDefinition(
                             lib_name=s.lib_name,
-                            lib_path=rebase_relative_path(s.lib_path, original_base_folder, new_base_folder)
+                            lib_path=rebase(s.lib_path)
                         )
                     )
                 elif isinstance(s, LibraryMapInclude):
                     new_statements.append(
-                        LibraryMapInclude(include_path=rebase_relative_path(s.include_path, original_base_folder, new_base_folder))
+                        LibraryMapInclude(include_path=rebase(s.include_path))
                     )
             cfg.statements = new_statements
-        cfg.write_json(new_path)
+            cfg.write_json(new_path)
+        elif Path(original_path).resolve() != Path(new_path).resolve():
+            # NOTE: nothing to rebase, copy the file as is instead of serializing it again
+            shutil.copyfile(original_path, new_path)
         return cfg
     
     @classmethod
     def read_json(cls, path: Path) -> LibraryMapConfig:
-        with open(path) as f:
-            data = json.load(f)
-            return dataclass_from_dict(cls, data)
+        # NOTE: library maps are small, a single binary read is cheaper than mmap,
+        #       and json.loads detects the UTF encoding that write_json uses
+        with open(path, 'rb') as f:
+            raw = f.read()
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        return dataclass_from_dict(cls, data)
         
     @classmethod
     def from_json_string(cls, json_string: str) -> LibraryMapConfig:
-        data = json.loads(json_string)
+        data = orjson.loads(json_string) if orjson is not None else json.loads(json_string)
         return dataclass_from_dict(cls, data)
         
+    # NOTE: writing stays with the stdlib json module, orjson only supports 2-space indentation
+    #       and the written maps should look the same, regardless of whether orjson is installed
     def write_json(self, path: Path):
         with open(path, 'w', encoding='utf-8') as f:
-            json.dump(asdict(self), f, indent=4, cls=JSONEncoderSupportingPaths)
+            json.dump(self.json_dict(), f, indent=4, cls=JSONEncoderSupportingPaths)
 
     def json_string(self) -> str:
-        return json.dumps(asdict(self), indent=4, cls=JSONEncoderSupportingPaths)
+        return json.dumps(self.json_dict(), indent=4, cls=JSONEncoderSupportingPaths)
+
+    def json_dict(self) -> Dict[str, Any]:
+        """
+        Flat replacement for dataclasses.asdict, which deep-copies every statement
+        
+        NOTE: paths are left to JSONEncoderSupportingPaths, as before
+        """
+        return {
+            'technology': self.technology,
+            'statements': [STATEMENT_JSON_DICT[type(s)](s) for s in self.statements],
+        }
+
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        if name == 'statements':
+            # NOTE: assigning new statements (e.g. load_as_copy) invalidates the derived lists
+            self.__dict__.pop('_statements_by_kind', None)
 
     @cached_property
+    def _statements_by_kind(self) -> Tuple[List[LibraryMapInclude], 
+                                           List[LibraryDefinition], 
+                                           List[Union[LibraryDefinition, LibraryMapInclude]]]:
+        # NOTE: a single pass over the statements for all lists
+        includes = []
+        definitions = []
+        library_statements = []
+        for s in self.statements:
+            if isinstance(s, LibraryMapInclude):
+                includes.append(s)
+                library_statements.append(s)
+            elif isinstance(s, LibraryDefinition):
+                definitions.append(s)
+                library_statements.append(s)
+        return includes, definitions, library_statements
+
+    @property
     def library_map_includes(self) -> List[LibraryMapInclude]:
-        return [s for s in self.statements if isinstance(s, LibraryMapInclude)]
+        return self._statements_by_kind[0]
 
-    @cached_property
+    @property
     def library_definitions(self) -> List[LibraryDefinition]:
-        return [s for s in self.statements if isinstance(s, LibraryDefinition)]
+        return self._statements_by_kind[1]
+
+    @property
+    def library_statements(self) -> List[Union[LibraryDefinition, LibraryMapInclude]]:
+        """
+        Definitions and includes in map order, i.e. the statements without comments
+        """
+        return self._statements_by_kind[2]
 
     @staticmethod
     def abbreviate_path(path: Path, base_folder: Path) -> Path:
@@ -160,51 +243,189 @@ class LibraryMapConfig:
         path = path.resolve()
         return path
     
-    def validate_path(self, 
-                      path: Union[Path, str],
+    @staticmethod
+    def validate_path(path: Union[Path, str],
                       read_bytes: int = 4) -> Optional[str]:
-        path = Path(path)
-        if not path.exists():
+        # NOTE: a single stat instead of exists() + is_file(),
+        #       and a raw os.open/os.read probe instead of a buffered file object
+        try:
+            st = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
             return 'File does not exist'
-        elif not path.is_file():
+        except OSError as e:
+            return f"Unreadable: {e}"
+        if not stat.S_ISREG(st.st_mode):
             return 'Not a regular file'
-        else:
-            if read_bytes > 0:
+        if read_bytes > 0:
+            try:
+                fd = os.open(path, os.O_RDONLY)
                 try:
-                    with open(path, 'rb') as f:
-                        f.read(read_bytes)
-                except Exception as e:
-                    return f"Unreadable: {e}"
+                    os.read(fd, read_bytes)
+                finally:
+                    os.close(fd)
+            except Exception as e:
+                return f"Unreadable: {e}"
         return None
     
+    @cached_property
+    def _effective_library_definitions_cache(self) -> Dict[str, Tuple[Tuple[Any, ...],
+                                                                      List[Tuple[Path, Path, Path, Optional[Tuple[int, int]]]],
+                                                                      List[LibraryDefinition],
+                                                                      LibraryMapIssues]]:
+        # NOTE: a cached_property (and not a field), so it is neither serialized nor compared
+        return {}
+    
+    def _statements_key(self) -> Tuple[Any, ...]:
+        return tuple(s.comment if isinstance(s, LibraryMapComment) else s for s in self.statements)
+    
     def effective_library_definitions(self, base_folder: Path, issues: LibraryMapIssues) -> List[LibraryDefinition]:
         """
         Resolve all includes to get the effective list of definitions
+        
+        NOTE: the result is reused while the statements, the resolved paths
+              and the stat signatures of all library and include files it was derived from, 
+              are unchanged (paths are resolved again, a symlink might have been retargeted)
         """
-        libs = []
+        key = os.fspath(base_folder)
+        statements_key = self._statements_key()
+        cached = self._effective_library_definitions_cache.get(key, None)
+        if cached is not None:
+            cached_statements_key, signatures, libs, cached_issues = cached
+            if cached_statements_key == statements_key and \
+               all(LibraryMapConfig.resolve_path(path, folder) == resolved_path and \
+                   stat_signature(resolved_path) == signature
+                   for path, folder, resolved_path, signature in signatures):
+                issues.failed_libraries.extend(cached_issues.failed_libraries)
+                issues.failed_includes.extend(cached_issues.failed_includes)
+                return list(libs)
         
-        for s in self.statements:
-            if isinstance(s, LibraryMapComment):
+        new_issues = LibraryMapIssues()
+        dependency_paths: List[Tuple[Path, Path, Path]] = []
+        libs = self._collect_library_definitions(base_folder, new_issues, dependency_paths)
+        signatures = [(path, folder, resolved_path, stat_signature(resolved_path)) 
+                      for path, folder, resolved_path in dependency_paths]
+        self._effective_library_definitions_cache[key] = (statements_key, signatures, libs, new_issues)
+        
+        issues.failed_libraries.extend(new_issues.failed_libraries)
+        issues.failed_includes.extend(new_issues.failed_includes)
+        return list(libs)
+    
+    def _collect_library_definitions(self, 
+                                     base_folder: Path, 
+                                     issues: LibraryMapIssues,
+                                     dependency_paths: List[Tuple[Path, Path, Path]]) -> List[LibraryDefinition]:
+        collector = LibraryDefinitionCollector(issues=issues, dependency_paths=dependency_paths)
+        return collector.collect(self, Path(base_folder))
+
+#--------------------------------------------------------------------------------
+
+class LibraryDefinitionCollector:
+    """
+    Iterative depth-first walk over a library map and its includes,
+    so included definitions keep their position in the map order;
+    each include file is visited only once (diamond shaped or cyclic includes)
+    """
+    
+    def __init__(self, issues: LibraryMapIssues, dependency_paths: List[Tuple[Path, Path, Path]]):
+        self.issues = issues
+        self.dependency_paths = dependency_paths
+        self.libs: List[LibraryDefinition] = []
+        self.visited_includes: Set[Path] = set()
+        # NOTE: only for the duration of one pass, a symlink (e.g. to a PDK version)
+        #       or an environment variable may change between two reloads
+        self.resolved_paths: Dict[Tuple[str, str], Path] = {}
+        self.stack: List[Tuple[Iterator[LibraryMapStatement], Path]] = []
+    
+    def collect(self, config: LibraryMapConfig, base_folder: Path) -> List[LibraryDefinition]:
+        self.stack.append((iter(config.library_statements), base_folder))
+        while self.stack:
+            statements, folder = self.stack[-1]
+            s = next(statements, None)
+            if s is None:
+                self.stack.pop()
                 continue
-            elif isinstance(s, LibraryDefinition):
-                lib_path = self.resolve_path(s.lib_path, base_folder)
-                libs += [LibraryDefinition(s.lib_name, lib_path)]
-                issue = self.validate_path(lib_path)
-                if issue:
-                    issues.failed_libraries.append((s, issue))
-            elif isinstance(s, LibraryMapInclude):
-                path = expand_path(s.include_path)
-                path = self.resolve_path(path, base_folder)
-                if str(path).strip() == '':
-                    print(f"ERROR: library map file contains non-file include entry: '{s.include_path}', ignoring…")
-                    continue
-                issue = self.validate_path(path)
-                if issue:
-                    issues.failed_includes.append((s, issue))
-                else:
-                    config = LibraryMapConfig.read_json(path)
-                    libs += config.effective_library_definitions(base_folder=path.parent, issues=issues)
-        return libs
+            self.HANDLERS[type(s)](self, s, folder)
+        return self.libs
+    
+    def resolve_path(self, path: Path, folder: Path) -> Path:
+        key = (os.fspath(path), os.fspath(folder))
+        resolved_path = self.resolved_paths.get(key, None)
+        if resolved_path is None:
+            resolved_path = LibraryMapConfig.resolve_path(path, folder)
+            self.resolved_paths[key] = resolved_path
+        return resolved_path
+    
+    def on_definition(self, s: LibraryDefinition, folder: Path):
+        lib_path = self.resolve_path(s.lib_path, folder)
+        self.libs.append(LibraryDefinition(s.lib_name, lib_path))
+        self.dependency_paths.append((s.lib_path, folder, lib_path))
+        issue = LibraryMapConfig.validate_path(lib_path)
+        if issue:
+            self.issues.failed_libraries.append((s, issue))
+    
+    def on_include(self, s: LibraryMapInclude, folder: Path):
+        path = self.resolve_path(s.include_path, folder)
+        if str(path).strip() == '':
+            print(f"ERROR: library map file contains non-file include entry: '{s.include_path}', ignoring…")
+            return
+        if path in self.visited_includes:
+            return
+        self.visited_includes.add(path)
+        self.dependency_paths.append((s.include_path, folder, path))
+        issue = LibraryMapConfig.validate_path(path)
+        if issue:
+            self.issues.failed_includes.append((s, issue))
+        else:
+            config = read_library_map_cached(path)
+            self.stack.append((iter(config.library_statements), path.parent))
+    
+    # NOTE: dispatch by the exact statement type, 
+    #       new statement kinds only need a handler registered here
+    HANDLERS: Dict[type, Callable[[LibraryDefinitionCollector, LibraryMapStatement, Path], None]] = {
+        LibraryDefinition: on_definition,
+        LibraryMapInclude: on_include,
+    }
+
+#--------------------------------------------------------------------------------
+
+def stat_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+_library_map_config_cache: Dict[Path, Tuple[Tuple[int, int], LibraryMapConfig]] = {}
+
+
+def read_library_map_cached(path: Path) -> LibraryMapConfig:
+    """
+    Reads a library map, reusing the previously parsed config while the file is unchanged
+    
+    NOTE: menu actions and templates load the same maps over and over again,
+          the stat signature (mtime, size) decides whether to parse again
+    """
+    path = Path(path)
+    st = os.stat(path)
+    signature = (st.st_mtime_ns, st.st_size)
+    cached = _library_map_config_cache.get(path, None)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    config = LibraryMapConfig.read_json(path)
+    _library_map_config_cache[path] = (signature, config)
+    return config
+
+
+def write_library_map_cached(config: LibraryMapConfig, path: Path):
+    """
+    Writes a library map and seeds the read cache with it,
+    so reading the just written file again does not parse it
+    """
+    path = Path(path)
+    config.write_json(path)
+    st = os.stat(path)
+    _library_map_config_cache[path] = ((st.st_mtime_ns, st.st_size), config)
 
 #--------------------------------------------------------------------------------
 
@@ -258,6 +479,67 @@ class LibraryMapConfigTests(unittest.TestCase):
         obtained_libs = cfg.effective_library_definitions(base_folder=f"{os.environ['HOME']}", issues=issues)
         self.assertEqual(Path(f"{os.environ['HOME']}/my_stdcells.gds.gz").resolve(), obtained_libs[0].lib_path)
 
+    def write_library_maps(self, folder: Path, maps: Dict[str, List[LibraryMapStatement]]):
+        for name, statements in maps.items():
+            LibraryMapConfig(technology='sg13g2', statements=statements).write_json(folder / name)
+            for s in statements:
+                if isinstance(s, LibraryDefinition):
+                    (folder / s.lib_path).touch()
+    
+    def collect_lib_names(self, folder: Path, top_map_name: str) -> Tuple[List[str], LibraryMapIssues]:
+        issues = LibraryMapIssues()
+        cfg = LibraryMapConfig.read_json(folder / top_map_name)
+        libs = cfg.effective_library_definitions(base_folder=folder, issues=issues)
+        return [ld.lib_name for ld in libs], issues
+    
+    def test_resolution__nested_includes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            self.write_library_maps(folder, {
+                'top.klib': [LibraryDefinition('top_lib', Path('top_lib.gds')),
+                             LibraryMapInclude(Path('a.klib')),
+                             LibraryDefinition('top_lib2', Path('top_lib2.gds'))],
+                'a.klib': [LibraryMapInclude(Path('b.klib')),
+                           LibraryDefinition('a_lib', Path('a_lib.gds'))],
+                'b.klib': [LibraryDefinition('b_lib', Path('b_lib.gds'))],
+            })
+            lib_names, issues = self.collect_lib_names(folder, 'top.klib')
+            # NOTE: included definitions keep their position in the map order
+            self.assertEqual(['top_lib', 'b_lib', 'a_lib', 'top_lib2'], lib_names)
+            self.assertEqual([], issues.failed_libraries)
+            self.assertEqual([], issues.failed_includes)
+    
+    def test_resolution__diamond_includes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            self.write_library_maps(folder, {
+                'top.klib': [LibraryMapInclude(Path('a.klib')),
+                             LibraryMapInclude(Path('b.klib'))],
+                'a.klib': [LibraryDefinition('a_lib', Path('a_lib.gds')),
+                           LibraryMapInclude(Path('common.klib'))],
+                'b.klib': [LibraryDefinition('b_lib', Path('b_lib.gds')),
+                           LibraryMapInclude(Path('common.klib'))],
+                'common.klib': [LibraryDefinition('common_lib', Path('common_lib.gds'))],
+            })
+            lib_names, issues = self.collect_lib_names(folder, 'top.klib')
+            # NOTE: the shared include is only visited once
+            self.assertEqual(['a_lib', 'common_lib', 'b_lib'], lib_names)
+            self.assertEqual([], issues.failed_includes)
+    
+    def test_resolution__cyclic_includes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            self.write_library_maps(folder, {
+                'top.klib': [LibraryMapInclude(Path('a.klib'))],
+                'a.klib': [LibraryDefinition('a_lib', Path('a_lib.gds')),
+                           LibraryMapInclude(Path('b.klib'))],
+                'b.klib': [LibraryDefinition('b_lib', Path('b_lib.gds')),
+                           LibraryMapInclude(Path('a.klib'))],
+            })
+            lib_names, issues = self.collect_lib_names(folder, 'top.klib')
+            self.assertEqual(['a_lib', 'b_lib'], lib_names)
+            self.assertEqual([], issues.failed_includes)
+
         
 #--------------------------------------------------------------------------------
 
@@ -20,6 +20,8 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 import os
 from pathlib import Path
+import re
+import stat
 from typing import *
 import traceback
 
@@ -42,10 +44,150 @@ from new_hierarchical_layout_config import NewHierarchicalLayoutConfig, LibraryM
 
 path_containing_this_script = os.path.realpath(os.path.dirname(__file__))
 
+_ui_data: Optional[bytes] = None
+
+
+def new_hierarchical_layout_dialog_ui_data() -> bytes:
+    # NOTE: the .ui file is read from disk only once per session
+    global _ui_data
+    if _ui_data is None:
+        ui_path = os.path.join(path_containing_this_script, "NewHierarchicalLayoutDialog.ui")
+        with open(ui_path, 'rb') as f:
+            _ui_data = f.read()
+    return _ui_data
+
 #--------------------------------------------------------------------------------
 
 DEFAULT_TECH_LABEL='(Default)'
 
+# NOTE: mode -> (create empty map checked, use existing map checked, include/copy combo box index)
+LIBRARY_MAP_MODE_UI_STATES: Dict[LibraryMapCreationMode, Tuple[bool, bool, Optional[int]]] = {
+    LibraryMapCreationMode.CREATE_EMPTY: (True, False, None),
+    LibraryMapCreationMode.LINK_TEMPLATE: (False, True, 0),
+    LibraryMapCreationMode.COPY_TEMPLATE: (False, True, 1),
+}
+
+# NOTE: same as top_cell.replace('_', '').isalnum(), but without building a temporary string:
+#       letters, digits and underscores, with at least one letter or digit
+TOP_CELL_NAME_PATTERN = re.compile(r'(?=\w*[^\W_])\w+')
+
+# NOTE: plain decimal numbers, checked up front instead of catching the ValueError of float()
+FLOAT_PATTERN = re.compile(r'[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?')
+
+VALID_FIELD_STYLE_SHEET = ''  # reset to default
+INVALID_FIELD_STYLE_SHEET = 'background-color: rgba(255, 0, 0, 50);'  # light red
+
+
+COMMAND_HINT_ACTION_PATHS = {
+    'new': 'file_menu.new_hierarchical_layout',
+    'open': 'file_menu.open_hierarchical_layout',
+    'save': 'file_menu.save_hierarchical_layout',
+    'save_as': 'file_menu.save_as_hierarchical_layout',
+    'manage': 'file_menu.manage_cell_library_map',
+    'reload': 'file_menu.reload_cell_libraries',
+}
+
+# NOTE: filled in with the effective shortcuts of COMMAND_HINT_ACTION_PATHS via str.format
+COMMAND_HINTS_TEMPLATE = """
+<html><head/><body>
+<p>
+    <span style=" font-weight:600; text-decoration: underline;">NOTE:</span> 
+    For hierarchical layouts to work, the following commands must be used: 
+</p>
+<table border="1" style="margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px;" cellspacing="0" cellpadding="3">
+<tr>
+    <td><p align="center"><span style=" font-weight:600;">Menu Command</span></p></td>
+    <td><p align="center"><span style=" font-weight:600;">Shortcut</span></p></td>
+    <td><p align="center"><span style=" font-weight:600;">Description</span></p></td>
+</tr>
+<tr>
+    <td><p><span style="font-style:italic;">File → New Hierarchical Layout…</span></p></td>
+    <td><p><code>{new}</code></p></td>
+    <td><p>Create a new layout panel along with the library map</p></td>
+</tr>
+<tr>
+    <td><p><span style="font-style:italic;">File → Open Hierarchical Layout…</span></p></td>
+    <td><p><code>{open}</code></p></td>
+    <td><p>Open an existing hierarchical layout in a new panel</p></td></tr>
+<tr>
+    <td><p><span style="font-style:italic;">File → Save Hierarchical Layout</span></p></td>
+    <td><p><code>{save}</code></p></td>
+    <td><p>Save current hierarchical layout</p></td></tr>
+<tr>
+    <td><p><span style="font-style:italic;">File → Save Hierarchical Layout As…</span></p></td>
+    <td><p><code>{save_as}</code></p></td>
+    <td><p>Save current hierarchical layout under a different name</p></td>
+</tr>
+<tr>
+    <td><p><span style="font-style:italic;">File → Manage Cell Library Map…</span></p></td>
+    <td><p><code>{manage}</code></p></td>
+    <td><p>Manage cell library map</p></td>
+</tr>
+<tr>
+    <td><p><span style="font-style:italic;">File → Reload Cell Libraries…</span></p></td>
+    <td><p><code>{reload}</code></p></td>
+    <td><p>Reload cell libraries</p></td>
+</tr>
+</table></body></html>        
+"""
+
+
+def normalized_file_path(path_str: str) -> Optional[Path]:
+    """
+    Lexically normalizes a typed/pasted file path (e.g. 'a/../b', '~/x'),
+    returns None for malformed input, so validation can skip the file system checks
+    """
+    if '\0' in path_str:
+        return None
+    normalized = os.path.normpath(os.path.expanduser(path_str))
+    if os.path.basename(normalized) in ('', '.', '..'):
+        return None
+    return Path(normalized)
+
+
+def parse_positive_float(value_str: str) -> Optional[float]:
+    """
+    Returns the value of a positive decimal number string, None otherwise
+    """
+    if not FLOAT_PATTERN.fullmatch(value_str):
+        return None
+    value = float(value_str)
+    return value if value > 0 else None
+
+
+# NOTE: a single stat answers both "exists" and "is a directory/file"
+def is_directory(path: Path) -> bool:
+    try:
+        return stat.S_ISDIR(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def is_regular_file(path: Path) -> bool:
+    try:
+        return stat.S_ISREG(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+
+@dataclass(frozen=True)
+class NewHierarchicalLayoutDialogInputs:
+    """
+    Snapshot of the (stripped) field texts, 
+    so validate_ui_inputs and config_from_ui read each widget only once on OK
+    """
+    save_path_str: str
+    create_empty_map: bool
+    use_existing_map: bool
+    template_mode_index: int
+    template_path_str: str
+    tech_name: str
+    top_cell: str
+    dbu_str: str
+    window_str: str
+    layers_str: str
+
 
 class NewHierarchicalLayoutDialog(pya.QDialog):
     def __init__(self, parent=None):
@@ -54,13 +196,13 @@ class NewHierarchicalLayoutDialog(pya.QDialog):
         self.setWindowModality(pya.Qt.ApplicationModal)
         
         loader = pya.QUiLoader()
-        ui_path = os.path.join(path_containing_this_script, "NewHierarchicalLayoutDialog.ui")
-        ui_file = pya.QFile(ui_path)
+        ui_buffer = pya.QBuffer()
+        ui_buffer.setData(new_hierarchical_layout_dialog_ui_data())
         try:
-            ui_file.open(pya.QFile.ReadOnly)
-            self.page = loader.load(ui_file, self)
+            ui_buffer.open(pya.QIODevice.ReadOnly)
+            self.page = loader.load(ui_buffer, self)
         finally:
-            ui_file.close()
+            ui_buffer.close()
 
         self.bottom = pya.QHBoxLayout()
         self.okButton = pya.QPushButton('OK')
@@ -87,10 +229,27 @@ class NewHierarchicalLayoutDialog(pya.QDialog):
         self.page.create_empty_map_rb.toggled.connect(self.on_radio_buttons_changed)
         self.page.use_existing_map_rb.toggled.connect(self.on_radio_buttons_changed)
         
-        self.page.tech_cbx.clear()
+        self._tech_names: List[str] = []
+        self._last_layers_parse: Optional[Tuple[str, Any]] = None
+        self._command_hint_actions: Optional[Dict[str, pya.Action]] = None
+        self._command_hint_shortcuts: Optional[Dict[str, str]] = None
+        self.reset_fields()
+        
+    def reset_fields(self):
+        """
+        Reset all fields to the defaults for a new layout,
+        so the dialog instance can be reused
+        """
+        # NOTE: technologies can be registered while the dialog is hidden,
+        #       but the combo box only needs to be refilled if the list actually changed
         tech_names = [n if n != '' else DEFAULT_TECH_LABEL \
                       for n in pya.Technology.technology_names()]
-        self.page.tech_cbx.addItems(tech_names)
+        if tech_names != self._tech_names:
+            self.page.tech_cbx.clear()
+            self.page.tech_cbx.addItems(tech_names)
+            self._tech_names = tech_names
+        else:
+            self.page.tech_cbx.setCurrentIndex(0)
         
         preconfigured_tech: Optional[pya.Technology] = None
         cv = pya.CellView.active()
@@ -103,8 +262,16 @@ class NewHierarchicalLayoutDialog(pya.QDialog):
         
         config = NewHierarchicalLayoutConfig()
 
+        dir_str = FileSystemHelpers.least_recent_directory() or os.getcwd()
+        
+        # NOTE: list the directory once instead of probing 2 paths per candidate,
+        #       compare case-insensitively to be safe on case-insensitive file systems
+        try:
+            existing_names = {n.lower() for n in os.listdir(dir_str)}
+        except OSError:
+            existing_names = set()
+        
         def build_save_path(i: int) -> Path:
-            dir_str = FileSystemHelpers.least_recent_directory() or os.getcwd()
             file_str = f"{config.top_cell.lower() or 'top'}{'' if i==0 else i+1}{HIERARCHICAL_LAYOUT_FILE_SUFFIXES[0]}"
             return Path(dir_str) / file_str
         
@@ -113,7 +280,7 @@ class NewHierarchicalLayoutDialog(pya.QDialog):
         while True:
             save_path_candidate = build_save_path(i)
             lib_path = save_path_candidate.with_suffix(LIBRARY_MAP_FILE_SUFFIX)
-            if save_path_candidate.exists() or lib_path.exists():
+            if save_path_candidate.name.lower() in existing_names or lib_path.name.lower() in existing_names:
                 i += 1
                 continue
             else:
@@ -122,6 +289,12 @@ class NewHierarchicalLayoutDialog(pya.QDialog):
         
         self.update_ui_from_config(config)
         
+        # NOTE: fields marked invalid before the dialog was last closed now hold the defaults
+        page = self.page
+        for line_edit in (page.save_path_le, page.template_path_le, page.dbu_le, 
+                          page.window_le, page.topcell_le, page.layers_le):
+            self.set_field_valid(line_edit, True)
+        
         self._config = None
         
     def get_config(self) -> NewHierarchicalLayoutConfig:
@@ -131,35 +304,64 @@ class NewHierarchicalLayoutDialog(pya.QDialog):
         return self._config
         
     def set_field_valid(self, widget: pya.QLineEdit, valid: bool):
-        if valid:
-            widget.setStyleSheet('')  # reset to default
-        else:
-            widget.setStyleSheet('background-color: rgba(255, 0, 0, 50);')  # light red
+        # NOTE: setting a style sheet re-polishes the widget, so only do it on state changes
+        invalid = not valid
+        if bool(widget.property('_invalid')) == invalid:
+            return
+        widget.setProperty('_invalid', invalid)
+        widget.setStyleSheet(INVALID_FIELD_STYLE_SHEET if invalid else VALID_FIELD_STYLE_SHEET)
+        
+    def parse_layers(self, layers_str: str):
+        """
+        Parses the layer list string, reusing the last result if the string is unchanged
+        
+        NOTE: validate_ui_inputs and config_from_ui both need it on OK
+        """
+        if self._last_layers_parse is not None and self._last_layers_parse[0] == layers_str:
+            return self._last_layers_parse[1]
+        result = LayerList.parse_layer_list_string(layers_str)
+        self._last_layers_parse = (layers_str, result)
+        return result
+        
+    def ui_inputs(self) -> NewHierarchicalLayoutDialogInputs:
+        page = self.page
+        return NewHierarchicalLayoutDialogInputs(
+            save_path_str=page.save_path_le.text.strip(),
+            create_empty_map=page.create_empty_map_rb.checked,
+            use_existing_map=page.use_existing_map_rb.checked,
+            template_mode_index=page.include_or_copy_template_map_cb.currentIndex,
+            template_path_str=page.template_path_le.text.strip(),
+            tech_name=page.tech_cbx.currentText,
+            top_cell=page.topcell_le.text.strip(),
+            dbu_str=page.dbu_le.text.strip(),
+            window_str=page.window_le.text.strip(),
+            layers_str=page.layers_le.text
+        )
+        
+    def validate_ui_inputs(self, inputs: Optional[NewHierarchicalLayoutDialogInputs] = None):
+        if inputs is None:
+            inputs = self.ui_inputs()
         
-    def validate_ui_inputs(self):
         valid = True
     
-        save_path_str = self.page.save_path_le.text.strip()
-        save_path = Path(save_path_str) if save_path_str else None
-        if not save_path_str:
+        save_path_str = inputs.save_path_str
+        # NOTE: check the suffix on the plain string first, 
+        #       the path is only normalized and its folder stat'ed if that passes
+        if not save_path_str.lower().endswith(HIERARCHICAL_LAYOUT_FILE_SUFFIXES):
             self.set_field_valid(self.page.save_path_le, False)
             valid = False
         else:
-            save_path = Path(save_path_str)
-            parent_dir = save_path.parent
-            if not parent_dir.exists() or not parent_dir.is_dir():
-                self.set_field_valid(self.page.save_path_le, False)
-                valid = False
-            elif '.'.join(save_path.suffixes).lower() in HIERARCHICAL_LAYOUT_FILE_SUFFIXES:
+            save_path = normalized_file_path(save_path_str)
+            if save_path is None or not is_directory(save_path.parent):
                 self.set_field_valid(self.page.save_path_le, False)
                 valid = False
             else:
                 self.set_field_valid(self.page.save_path_le, True)
     
-        if self.page.use_existing_map_rb.checked:
-            template_path_str = self.page.template_path_le.text.strip()
-            template_path = Path(template_path_str) if template_path_str else None
-            if not template_path or not template_path.exists() or not template_path.is_file():
+        if inputs.use_existing_map:
+            template_path_str = inputs.template_path_str
+            template_path = normalized_file_path(template_path_str) if template_path_str else None
+            if not template_path or not is_regular_file(template_path):
                 self.set_field_valid(self.page.template_path_le, False)
                 valid = False
             else:
@@ -167,34 +369,27 @@ class NewHierarchicalLayoutDialog(pya.QDialog):
         else:
             self.set_field_valid(self.page.template_path_le, True)
     
-        dbu_str = self.page.dbu_le.text.strip()
-        try:
-            dbu = float(dbu_str) if dbu_str else None
-            if dbu is not None and dbu <= 0:
-                raise ValueError
-            self.set_field_valid(self.page.dbu_le, True)
-        except ValueError:
+        dbu_str = inputs.dbu_str
+        if dbu_str and parse_positive_float(dbu_str) is None:
             self.set_field_valid(self.page.dbu_le, False)
             valid = False
+        else:
+            self.set_field_valid(self.page.dbu_le, True)
     
-        try:
-            window = float(self.page.window_le.text.strip())
-            if window <= 0:
-                raise ValueError
-            self.set_field_valid(self.page.window_le, True)
-        except ValueError:
+        if parse_positive_float(inputs.window_str) is None:
             self.set_field_valid(self.page.window_le, False)
             valid = False
+        else:
+            self.set_field_valid(self.page.window_le, True)
     
-        top_cell = self.page.topcell_le.text.strip()
-        if top_cell and not top_cell.replace("_", "").isalnum():
+        top_cell = inputs.top_cell
+        if top_cell and not TOP_CELL_NAME_PATTERN.fullmatch(top_cell):
             self.set_field_valid(self.page.topcell_le, False)
             valid = False
         else:
             self.set_field_valid(self.page.topcell_le, True)
     
-        layers_str = self.page.layers_le.text
-        if LayerList.is_valid_layer_list_string(layers_str):
+        if len(self.parse_layers(inputs.layers_str).errors) == 0:
             self.set_field_valid(self.page.layers_le, True)
         else:
             valid = False
@@ -202,33 +397,35 @@ class NewHierarchicalLayoutDialog(pya.QDialog):
                         
         return valid
         
-    def config_from_ui(self) -> NewHierarchicalLayoutConfig:
-        save_path_str = self.page.save_path_le.text.strip()
-        save_path = Path(save_path_str) if save_path_str else None
+    def config_from_ui(self, inputs: Optional[NewHierarchicalLayoutDialogInputs] = None) -> NewHierarchicalLayoutConfig:
+        if inputs is None:
+            inputs = self.ui_inputs()
+        
+        save_path_str = inputs.save_path_str
+        save_path = normalized_file_path(save_path_str) if save_path_str else None
 
         mode: LibraryMapCreationMode
         template_path: Optional[Path]
         
-        if self.page.create_empty_map_rb.checked:
+        if inputs.create_empty_map:
             mode = LibraryMapCreationMode.CREATE_EMPTY
             template_path = None
         else:
-            mode_index = self.page.include_or_copy_template_map_cb.currentIndex
+            mode_index = inputs.template_mode_index
             mode = LibraryMapCreationMode.LINK_TEMPLATE if mode_index == 0 else LibraryMapCreationMode.COPY_TEMPLATE
-            template_path_str = self.page.template_path_le.text.strip()
-            template_path = Path(template_path_str) if template_path_str else None
+            template_path_str = inputs.template_path_str
+            template_path = normalized_file_path(template_path_str) if template_path_str else None
         
-        dbu_str = self.page.dbu_le.text.strip()
+        dbu_str = inputs.dbu_str
         dbu_um = float(dbu_str) if dbu_str else None
         
-        window_str = self.page.window_le.text.strip()
+        window_str = inputs.window_str
         initial_window_um = float(window_str) if window_str else 2.0
         
-        tech_name = self.page.tech_cbx.currentText
+        tech_name = inputs.tech_name
         if tech_name == DEFAULT_TECH_LABEL: tech_name = None
         
-        layers_str = self.page.layers_le.text
-        layer_list_parse_result = LayerList.parse_layer_list_string(layers_str)
+        layer_list_parse_result = self.parse_layers(inputs.layers_str)
         initial_layers = layer_list_parse_result.result if len(layer_list_parse_result.errors) == 0 else LayerList()
         
         return NewHierarchicalLayoutConfig(
@@ -236,7 +433,7 @@ class NewHierarchicalLayoutDialog(pya.QDialog):
             library_map_creation_mode=mode,
             library_map_template_path=template_path,
             tech_name=tech_name,
-            top_cell=self.page.topcell_le.text.strip() or 'TOP',
+            top_cell=inputs.top_cell or 'TOP',
             dbu_um=dbu_um,
             initial_window_um=initial_window_um,
             initial_layers=initial_layers
@@ -246,128 +443,91 @@ class NewHierarchicalLayoutDialog(pya.QDialog):
         if Debugging.DEBUG:
             debug("LibraryManagerDialog.update_ui_from_config")
         
-        self.page.save_path_le.setText('' if config.save_path is None else str(config.save_path))
-        
-        match config.library_map_creation_mode:
-            case LibraryMapCreationMode.CREATE_EMPTY:
-                self.page.create_empty_map_rb.setChecked(True)
-                self.page.use_existing_map_rb.setChecked(False)
-                self.page.include_or_copy_template_map_cb.setEnabled(False)
-                self.page.template_path_le.setEnabled(False)
-                self.page.browse_template_map_pb.setEnabled(False)
-            case LibraryMapCreationMode.LINK_TEMPLATE:
-                self.page.create_empty_map_rb.setChecked(False)
-                self.page.use_existing_map_rb.setChecked(True)
-                self.page.include_or_copy_template_map_cb.setEnabled(True)
-                self.page.include_or_copy_template_map_cb.setCurrentIndex(0)
-                self.page.template_path_le.setEnabled(True)
-                self.page.browse_template_map_pb.setEnabled(True)
-            case LibraryMapCreationMode.COPY_TEMPLATE:
-                self.page.create_empty_map_rb.setChecked(False)
-                self.page.use_existing_map_rb.setChecked(True)
-                self.page.include_or_copy_template_map_cb.setEnabled(True)
-                self.page.include_or_copy_template_map_cb.setCurrentIndex(1)
-                self.page.template_path_le.setEnabled(True)
-                self.page.browse_template_map_pb.setEnabled(True)
+        # NOTE: each setChecked emits toggled for both radio buttons, 
+        #       block them during the bulk update and sync the dependent widgets once afterwards
+        radio_buttons = (self.page.create_empty_map_rb, self.page.use_existing_map_rb)
+        for rb in radio_buttons:
+            rb.blockSignals(True)
+        try:
+            self.page.save_path_le.setText('' if config.save_path is None else str(config.save_path))
+        
+            create_empty, use_existing, template_mode_index = \
+                LIBRARY_MAP_MODE_UI_STATES[config.library_map_creation_mode]
+            self.page.create_empty_map_rb.setChecked(create_empty)
+            self.page.use_existing_map_rb.setChecked(use_existing)
+            if template_mode_index is not None:
+                self.page.include_or_copy_template_map_cb.setCurrentIndex(template_mode_index)
+            self.set_template_widgets_enabled(use_existing)
                 
-        self.page.template_path_le.setText(
-            '' if config.library_map_template_path is None else str(config.library_map_template_path)
-        )
+            self.page.template_path_le.setText(
+                '' if config.library_map_template_path is None else str(config.library_map_template_path)
+            )
         
-        # NOTE: self.page.tech_cbx is handled in ctor
+            # NOTE: self.page.tech_cbx is handled in reset_fields
         
-        self.page.topcell_le.setText('' if config.top_cell is None else str(config.top_cell))
-        self.page.dbu_le.setText('' if config.dbu_um is None else str(config.dbu_um))
-        self.page.window_le.setText('' if config.initial_window_um is None else str(config.initial_window_um))
-        self.page.layers_le.setText(str(config.initial_layers))
+            self.page.topcell_le.setText('' if config.top_cell is None else str(config.top_cell))
+            self.page.dbu_le.setText('' if config.dbu_um is None else str(config.dbu_um))
+            self.page.window_le.setText('' if config.initial_window_um is None else str(config.initial_window_um))
+            self.page.layers_le.setText(str(config.initial_layers))
+        finally:
+            for rb in radio_buttons:
+                rb.blockSignals(False)
         
         self.on_radio_buttons_changed()
         
-        mw = pya.MainWindow.instance()
-        menu = mw.menu()
-        action_new_hierarchical_layout = menu.action('file_menu.new_hierarchical_layout')
-        action_open_hierarchical_layout = menu.action('file_menu.open_hierarchical_layout')
-        action_save_hierarchical_layout = menu.action('file_menu.save_hierarchical_layout')
-        action_save_as_hierarchical_layout = menu.action('file_menu.save_as_hierarchical_layout')
-        action_manage_cell_library_map = menu.action('file_menu.manage_cell_library_map')
-        action_reload_cell_libraries = menu.action('file_menu.reload_cell_libraries')
+        self.update_command_hints()
         
-        self.page.command_hints_lbl.setText(f"""
-<html><head/><body>
-<p>
-    <span style=" font-weight:600; text-decoration: underline;">NOTE:</span> 
-    For hierarchical layouts to work, the following commands must be used: 
-</p>
-<table border="1" style="margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px;" cellspacing="0" cellpadding="3">
-<tr>
-    <td><p align="center"><span style=" font-weight:600;">Menu Command</span></p></td>
-    <td><p align="center"><span style=" font-weight:600;">Shortcut</span></p></td>
-    <td><p align="center"><span style=" font-weight:600;">Description</span></p></td>
-</tr>
-<tr>
-    <td><p><span style="font-style:italic;">File → New Hierarchical Layout…</span></p></td>
-    <td><p><code>{action_new_hierarchical_layout.effective_shortcut()}</code></p></td>
-    <td><p>Create a new layout panel along with the library map</p></td>
-</tr>
-<tr>
-    <td><p><span style="font-style:italic;">File → Open Hierarchical Layout…</span></p></td>
-    <td><p><code>{action_open_hierarchical_layout.effective_shortcut()}</code></p></td>
-    <td><p>Open an existing hierarchical layout in a new panel</p></td></tr>
-<tr>
-    <td><p><span style="font-style:italic;">File → Save Hierarchical Layout</span></p></td>
-    <td><p><code>{action_save_hierarchical_layout.effective_shortcut()}</code></p></td>
-    <td><p>Save current hierarchical layout</p></td></tr>
-<tr>
-    <td><p><span style="font-style:italic;">File → Save Hierarchical Layout As…</span></p></td>
-    <td><p><code>{action_save_as_hierarchical_layout.effective_shortcut()}</code></p></td>
-    <td><p>Save current hierarchical layout under a different name</p></td>
-</tr>
-<tr>
-    <td><p><span style="font-style:italic;">File → Manage Cell Library Map…</span></p></td>
-    <td><p><code>{action_manage_cell_library_map.effective_shortcut()}</code></p></td>
-    <td><p>Manage cell library map</p></td>
-</tr>
-<tr>
-    <td><p><span style="font-style:italic;">File → Reload Cell Libraries…</span></p></td>
-    <td><p><code>{action_reload_cell_libraries.effective_shortcut()}</code></p></td>
-    <td><p>Reload cell libraries</p></td>
-</tr>
-</table></body></html>        
-""")
+    def update_command_hints(self):
+        # NOTE: the menu actions are looked up once, 
+        #       the hints are only re-rendered if a shortcut was changed in the meantime
+        if self._command_hint_actions is None:
+            menu = pya.MainWindow.instance().menu()
+            self._command_hint_actions = {key: menu.action(path) for key, path in COMMAND_HINT_ACTION_PATHS.items()}
+        
+        shortcuts = {key: action.effective_shortcut() for key, action in self._command_hint_actions.items()}
+        if shortcuts == self._command_hint_shortcuts:
+            return
+        self._command_hint_shortcuts = shortcuts
+        self.page.command_hints_lbl.setText(COMMAND_HINTS_TEMPLATE.format(**shortcuts))
         
     def on_ok(self):
         if Debugging.DEBUG:
             debug("NewHierarchicalLayoutDialog.on_ok")
         
         try:
-            if self.validate_ui_inputs():
-                self._config = self.config_from_ui()
+            # NOTE: read the widgets once for both validation and the resulting config
+            inputs = self.ui_inputs()
+            if self.validate_ui_inputs(inputs):
+                self._config = self.config_from_ui(inputs)
                 self.accept()
         except Exception as e:
             print("NewHierarchicalLayoutDialog.on_ok caught an exception", e)
-            traceback.print_exc()
+            if Debugging.DEBUG:
+                traceback.print_exc()
 
     def on_cancel(self):
         if Debugging.DEBUG:
             debug("NewHierarchicalLayoutDialog.on_cancel")
         self.reject()
     
+    def set_template_widgets_enabled(self, enabled: bool):
+        self.page.include_or_copy_template_map_cb.setEnabled(enabled)
+        self.page.template_path_le.setEnabled(enabled)
+        self.page.browse_template_map_pb.setEnabled(enabled)
+    
     def on_radio_buttons_changed(self):
         if Debugging.DEBUG:
             debug("NewHierarchicalLayoutDialog.on_radio_buttons_changed")
             
         try:
             if self.page.create_empty_map_rb.checked:
-                self.page.include_or_copy_template_map_cb.setEnabled(False)
-                self.page.template_path_le.setEnabled(False)
-                self.page.browse_template_map_pb.setEnabled(False)
+                self.set_template_widgets_enabled(False)
             elif self.page.use_existing_map_rb.checked:
-                self.page.include_or_copy_template_map_cb.setEnabled(True)
-                self.page.template_path_le.setEnabled(True)
-                self.page.browse_template_map_pb.setEnabled(True)
+                self.set_template_widgets_enabled(True)
         except Exception as e:
             print("NewHierarchicalLayoutDialog.on_radio_buttons_changed caught an exception", e)
-            traceback.print_exc()
+            if Debugging.DEBUG:
+                traceback.print_exc()
     
     def on_browse_save_path(self):
         if Debugging.DEBUG:
@@ -385,14 +545,15 @@ class NewHierarchicalLayoutDialog(pya.QDialog):
         
             if file_path_str:
                 file_path = Path(file_path_str)
-                if '.'.join(file_path.suffixes).lower() not in HIERARCHICAL_LAYOUT_FILE_SUFFIXES:
+                if not file_path_str.lower().endswith(HIERARCHICAL_LAYOUT_FILE_SUFFIXES):
                     file_path = file_path.with_suffix(HIERARCHICAL_LAYOUT_FILE_SUFFIXES[0])   # TODO: determine suffix from user-chosen filter
-                self.page.save_path_le.setText(file_path)
+                self.page.save_path_le.setText(str(file_path))
                 
                 FileSystemHelpers.set_least_recent_directory(file_path.parent)
         except Exception as e:
             print("NewHierarchicalLayoutDialog.on_browse_save_path caught an exception", e)
-            traceback.print_exc()
+            if Debugging.DEBUG:
+                traceback.print_exc()
 
     def on_browse_template_map_path(self):
         if Debugging.DEBUG:
@@ -410,7 +571,10 @@ class NewHierarchicalLayoutDialog(pya.QDialog):
         
             if file_path:
                 self.page.template_path_le.setText(file_path)
+                
+                FileSystemHelpers.set_least_recent_directory(Path(file_path).parent)
         except Exception as e:
-            print("NewHierarchicalLayoutDialog.on_browse_save_path caught an exception", e)
-            traceback.print_exc()
+            print("NewHierarchicalLayoutDialog.on_browse_template_map_path caught an exception", e)
+            if Debugging.DEBUG:
+                traceback.print_exc()
             